@@ -1868,13 +1868,14 @@ class RSProfileManager:
             List[str] -- The list of profile names in the working Rocksmith file set.
 
         """
-        ret_val: List[str] = list()
-        for profile in self._profiles.values():
-            name = profile.player_name
-            if name and name not in ret_val:
-                ret_val.append(name)
-
-        return ret_val
+        # dict.fromkeys removes repeated names in one pass, preserving order.
+        return list(
+            dict.fromkeys(
+                profile.player_name
+                for profile in self._profiles.values()
+                if profile.player_name
+            )
+        )
 
     def unique_id_to_profile(self, unique_id: str) -> str:
         """Convert a unique id to a Rocksmith profile name.
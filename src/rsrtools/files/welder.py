@@ -10,21 +10,25 @@ TODO: It does not yet provide psarc file write routines.
 # pylint: disable=too-many-lines
 
 import argparse
+import bisect
 import hashlib
+import os
 import struct
 import sys
 import zlib
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from os import fsdecode
+from itertools import accumulate
+from os import cpu_count, fsdecode
 from pathlib import Path
 from types import TracebackType
-from typing import Any, BinaryIO, Iterator, List, Optional, TextIO, Tuple, Type, cast
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, TextIO, Tuple, Type
+from typing import cast
 from typing import TYPE_CHECKING
 from dataclasses import field
 from typing_extensions import Literal
 
 from Crypto.Cipher import AES
-from Crypto.Util import Counter
 
 from rsrtools.files.exceptions import RSFileFormatError
 from rsrtools.utils import rsrpad
@@ -57,10 +61,19 @@ SNG_IV_OFFSET = 8
 SNG_ENC_PAYLOAD_OFFSET = 24
 SNG_SIG_OFFSET = -56
 SNG_DEC_PAYLOAD_OFFSET = 4
+# Zero IV used for encryption and zero block that replaces the digital signature.
+SNG_ZERO_IV = bytes(16)
+SNG_ZERO_SIG = bytes(56)
 
 # WEM handling
 WEM_SUFFIX = ".wem".casefold()
 WEM_ALIGN_LEN = 8192
+# Shared zero block for wem alignment padding (written via memoryview slices).
+WEM_ALIGN_BLOCK = bytes(WEM_ALIGN_LEN)
+
+# Maximum buffers per os.writev call. POSIX only guarantees 16 (_XOPEN_IOV_MAX), but
+# Linux and macOS both allow 1024.
+WRITEV_MAX_BUFFERS = 1024
 
 CDLC_STD_MD5 = b"\xd5\x0f\x05d\xad\x0c\x0e\xb5\x9f\xe9\x0e\xc9\xb8\xbdq)"
 
@@ -132,8 +145,13 @@ class Welder:
         arc_name -- Returns the name and relative path of a indexed file in the archive.
             e.g. manifests/songs_dlc_bong/bong_lead.json
 
+        arc_name_casefold -- Casefolded version of arc_name for case insensitive
+            matching.
+
         arc_data -- returns the contents of an indexed file in the archive.
 
+        extract_files -- Write the contents of indexed files in the archive to disk.
+
         decrypt_sng -- Static method for decrypting SNG files.
 
         unpack -- Extract all files in the archive to disk.
@@ -183,6 +201,13 @@ class Welder:
     _odlc_wem: bool
     # Use CDLC md5 in packing.
     _use_cdlc_m5: bool
+    # Casefolded archive paths, in toc order (read mode only).
+    _arc_names_casefold: List[str]
+    # Casefolded archive path to toc index lookup (verify only).
+    _verify_lookup: Dict[str, int]
+    # Running total of block lengths, i.e. data section offset of the end of each
+    # block (verify only).
+    _block_ends: List[int]
 
     def __init__(
         self,
@@ -461,6 +486,9 @@ class Welder:
             # second entry
             self._toc_entries[i + 1].path = arc_path
 
+        # Casefold once here rather than on every name match.
+        self._arc_names_casefold = [x.path.casefold() for x in self._toc_entries]
+
     def arc_data(self, index: int, get_raw: bool = False) -> bytes:
         """Return the archive file contents for the item index.
 
@@ -472,6 +500,16 @@ class Welder:
         Returns:
             bytes -- File data. May be text as bytes.
 
+        """
+        return self._read_data(self._fd, index, get_raw)
+
+    def _read_data(self, file_handle: BinaryIO, index: int, get_raw: bool) -> bytes:
+        """Return the archive file contents for the item index read via file_handle.
+
+        Arguments are per arc_data, plus:
+            file_handle {BinaryIO} -- Binary file handle open on the archive. Threaded
+                readers must each supply their own handle.
+
         """
         # Nifty. Always nice to pick up something new from null pointer.
         data_stream = BytesIO()
@@ -480,14 +518,14 @@ class Welder:
 
         entry = self._toc_entries[index]
         # Find the start of the data based on offset from start of archive
-        self._fd.seek(entry.offset)
+        file_handle.seek(entry.offset)
 
         length = 0
         for block_len in self._block_lengths[entry.first_block_index:]:
             if block_len == 0:
                 block_len = self._default_block_len
 
-            chunk = self._fd.read(block_len)
+            chunk = file_handle.read(block_len)
             if get_raw:
                 raw_stream.write(chunk)
 
@@ -543,6 +581,7 @@ class Welder:
                 f"\n  {fsdecode(arc_dir)}."
             ) from f_e
 
+        targets: Dict[Path, int] = dict()
         for index in self:
             file = self._toc_entries[index]
             if file.path[0] == "/" or file.path[0] == "\\":
@@ -552,7 +591,36 @@ class Welder:
                 file_path = arc_dir.joinpath(file.path)
                 # Create the parent folders.
                 file_path.parent.mkdir(parents=True, exist_ok=True)
-                file_path.write_bytes(self.arc_data(index))
+                targets[file_path] = index
+
+        self.extract_files(targets)
+
+    def extract_files(self, targets: Dict[Path, int]) -> None:
+        """Write the contents of archive files to disk.
+
+        Arguments:
+            targets {Dict[Path, int]} -- The keys are the target file paths and the
+                values are the item indices (from the Welder iterator) of the archive
+                files to write to these paths. Parent folders must already exist.
+
+        Files are decompressed and written in a thread pool (zlib and file writes
+        release the GIL). Each worker opens its own handle on the archive, as the
+        instance file handle can't be shared between threads.
+        """
+
+        def extract_one(file_path: Path, index: int) -> None:
+            with open(self._path, "rb") as file_handle:
+                file_path.write_bytes(self._read_data(file_handle, index, False))
+
+        with ThreadPoolExecutor(max_workers=cpu_count()) as executor:
+            futures = [
+                executor.submit(extract_one, file_path, index)
+                for file_path, index in targets.items()
+            ]
+
+        for future in futures:
+            # Raise any exceptions from the workers.
+            future.result()
 
     def arc_name(self, index: int) -> str:
         """Return the archive file path for the item index.
@@ -566,6 +634,19 @@ class Welder:
         """
         return self._toc_entries[index].path
 
+    def arc_name_casefold(self, index: int) -> str:
+        """Return the casefolded archive file path for the item index.
+
+        Arguments:
+            index {int} -- Item index, should be from the Welder iterator.
+
+        Returns:
+            str -- The casefolded path and file name in the archive, for case
+                insensitive matching.
+
+        """
+        return self._arc_names_casefold[index]
+
     def verify(self, verify_io: TextIO) -> None:
         """Verify reconstructability of an archive opened in read mode.
 
@@ -589,6 +670,14 @@ class Welder:
         self._verify_io = verify_io
         self._verify_log(f"Verifying '{fsdecode(self._path.name)}'.")
         self._verify_indent = "    "
+        # In verify mode, the manifest is the toc path list, so toc indices can be
+        # looked up directly from the casefolded archive paths (first match wins).
+        self._verify_lookup = dict()
+        for index, arc_path in enumerate(self._arc_names_casefold):
+            self._verify_lookup.setdefault(arc_path, index)
+        self._block_ends = list(
+            accumulate(x if x else DEFAULT_BLOCK_LEN for x in self._block_lengths)
+        )
         self._pack(None)
         if self._verify_warnings > 0:
             self._verify_log(
@@ -648,7 +737,10 @@ class Welder:
                     )
 
         else:
-            md5 = hashlib.md5(manifest[index].encode()).digest()
+            # The toc md5 is a hash of the archive path, not the file contents, and
+            # has no security role. Flagging this lets hashlib use the plain digest
+            # even on OpenSSL builds that restrict md5.
+            md5 = hashlib.md5(manifest[index].encode(), usedforsecurity=False).digest()
 
         return md5
 
@@ -761,26 +853,31 @@ class Welder:
         return manifest
 
     def _arc_entry(
-        self, file_data: bytes, compress: bool = True
-    ) -> Tuple[bytes, List[int]]:
-        """Create the data for an archive entry from the supplied file contents.
+        self, file_stream: BinaryIO, compress: bool = True
+    ) -> Tuple[bytes, List[int], int]:
+        """Create the data for an archive entry from the supplied file stream.
 
         Arguments:
-            file_data {bytes} -- The file data to be packed.
+            file_stream {BinaryIO} -- Binary stream containing the file data to be
+                packed. Data is read in DEFAULT_BLOCK_LEN chunks, so the whole file
+                never needs to be held in memory.
             compress {bool} -- True if default compression logic should be applied,
                 False if compression should be disabled for the file.
 
         Returns:
-            Tuple[bytes, List[int]] -- The packed data and the list of packed block
-                sizes.
+            Tuple[bytes, List[int], int] -- The packed data, the list of packed block
+                sizes and the size of the raw (unpacked) data.
 
         """
-        file_stream = BytesIO(file_data)
-        arc_stream = BytesIO()
+        # Collect the packed chunks and join once at the end. This creates the packed
+        # data in a single allocation, rather than via the BytesIO grow and copy.
+        arc_chunks: List[bytes] = list()
         block_lengths = list()
+        raw_length = 0
 
         raw = file_stream.read(DEFAULT_BLOCK_LEN)
         while raw:
+            raw_length = raw_length + len(raw)
             if compress:
                 chunk = zlib.compress(raw, zlib.Z_BEST_COMPRESSION)
 
@@ -790,17 +887,12 @@ class Welder:
             else:
                 chunk = raw
 
-            arc_stream.write(chunk)
+            arc_chunks.append(chunk)
             block_lengths.append(len(chunk) % DEFAULT_BLOCK_LEN)
 
             raw = file_stream.read(DEFAULT_BLOCK_LEN)
 
-        file_stream.close()
-
-        arc_data = arc_stream.getvalue()
-        arc_stream.close()
-
-        return arc_data, block_lengths
+        return b"".join(arc_chunks), block_lengths, raw_length
 
     def _get_data(
         self, pack_dir: Optional[Path], toc_entry: TocEntry, manifest: List[str]
@@ -818,6 +910,8 @@ class Welder:
                 block lengths, size of raw data.
 
         """
+        # Set if the file can be streamed directly from disk.
+        file_path: Optional[Path] = None
         if not toc_entry.path:
             # Manifest entry. Data is the same regardless of pack/verify mode.
             # Ignore empty string first entry.
@@ -826,15 +920,10 @@ class Welder:
         compress = True
         if self._verify:
             # Find the index for the file we are checking.
-            check_index = -1
-            arc_path = ""
-            for idx, arc_path in enumerate(manifest):
-                if arc_path.casefold() == toc_entry.path.casefold():
-                    check_index = idx
-                    break
+            check_index = self._verify_lookup.get(toc_entry.path.casefold(), -1)
             if check_index < 0:
                 raise IndexError(
-                    f"Manifest is missing an arc_path entry for {arc_path}."
+                    f"Manifest is missing an arc_path entry for {toc_entry.path}."
                 )
 
             if toc_entry.path:
@@ -855,7 +944,7 @@ class Welder:
 
         elif pack_dir is not None:
             if toc_entry.path:
-                data = pack_dir.joinpath(toc_entry.path).read_bytes()
+                file_path = pack_dir.joinpath(toc_entry.path)
                 if toc_entry.is_wem_file() and self._odlc_wem:
                     # No compression for wem in ODLC, handle alignment later
                     compress = False
@@ -864,14 +953,33 @@ class Welder:
             # shouldn't happen, but ...
             raise ValueError("Invalid argument combination (pack_dir is None?).")
 
-        # Encrypt data if needed, pack data, get block lengths
+        sng_key: Optional[bytes] = None
         if self._sng_crypto:
             if toc_entry.path.startswith(WIN_PATH):
-                data = self.encrypt_sng(data, WIN_KEY)
+                sng_key = WIN_KEY
             elif toc_entry.path.startswith(MAC_PATH):
-                data = self.encrypt_sng(data, MAC_KEY)
+                sng_key = MAC_KEY
+
+        if file_path is not None and sng_key is None:
+            # Nothing to do to the file contents, so stream them straight from disk
+            # into the packer rather than holding a full copy of the file in memory.
+            with file_path.open("rb") as file_stream:
+                arc_data, block_lengths, raw_length = self._arc_entry(
+                    file_stream, compress
+                )
 
-        arc_data, block_lengths = self._arc_entry(data, compress)
+        else:
+            if file_path is not None:
+                data = file_path.read_bytes()
+
+            # Encrypt data if needed, pack data, get block lengths
+            if sng_key is not None:
+                data = self.encrypt_sng(data, sng_key)
+
+            with BytesIO(data) as file_stream:
+                arc_data, block_lengths, raw_length = self._arc_entry(
+                    file_stream, compress
+                )
 
         if self._verify:
             # Verify packed data
@@ -893,19 +1001,19 @@ class Welder:
                 # everything in the file will become broken because offsets are
                 # shagged from here. Ugly, ugly, ugly hack.
                 arc_data = check_data
-                block_lengths = list()
-                arc_len = 0
-                for this_len in self._block_lengths[
-                    self._toc_entries[check_index].first_block_index:
-                ]:
-                    block_lengths.append(this_len)
-                    if this_len == 0:
-                        this_len = DEFAULT_BLOCK_LEN
-                    arc_len = arc_len + this_len
-                    if arc_len >= len(arc_data):
-                        break
-
-        return arc_data, block_lengths, len(data)
+                # Take the original blocks up to and including the first block that
+                # ends at or after the end of the original data.
+                first_block = self._toc_entries[check_index].first_block_index
+                if first_block > 0:
+                    data_end = self._block_ends[first_block - 1] + len(arc_data)
+                else:
+                    data_end = len(arc_data)
+                last_block = bisect.bisect_left(
+                    self._block_ends, data_end, lo=first_block
+                )
+                block_lengths = self._block_lengths[first_block: last_block + 1]
+
+        return arc_data, block_lengths, raw_length
 
     def _build_entries(self, pack_dir: Optional[Path], manifest: List[str]) -> None:
         """Build toc, block length vector and data blocks from manifest and pack_dir.
@@ -995,58 +1103,44 @@ class Welder:
         # block depends on the size of the header and the toc. Wem alignment block
         # inserts element into block lengths, changes offset and first block index
         # values, also need to add the block of zeros to the file data.
+        # The alignment block size is WEM_ALIGN_LEN - (offset % WEM_ALIGN_LEN), which
+        # lies in 1..WEM_ALIGN_LEN and is never zero (a zero block length would mean
+        # DEFAULT_BLOCK_LEN). So every wem file gets exactly one alignment block, and
+        # we know the size of the preamble before working out any offsets.
         align_blocks = 0
         block_len_count = 0
         for toc_entry in self._toc_entries:
             block_len_count = block_len_count + len(toc_entry.pack_lengths)
-            if self._odlc_wem:
-                # Count wem files, which is also the most likely number of aligns needed
-                if toc_entry.is_wem_file():
-                    align_blocks = align_blocks + 1
+            if self._odlc_wem and toc_entry.is_wem_file():
+                align_blocks = align_blocks + 1
 
-        aligns_used = -1
-        while aligns_used != align_blocks:
-            # may need more than one pass if doing wem align
-            aligns_used = 0
-            first_block_index = 0
-            self._block_lengths = list()
-
-            self._preamble_len = (
-                HEADER_BYTES
-                + len(self._toc_entries) * TOC_ENTRY_BYTES
-                + (block_len_count + align_blocks) * BLOCK_LEN_BYTES
-            )
-            offset = self._preamble_len
-
-            for toc_entry in self._toc_entries:
-                if self._odlc_wem and toc_entry.is_wem_file():
-                    # do the alignment thing, correct offsets, block lengths
-                    align_bytes = WEM_ALIGN_LEN - (offset % WEM_ALIGN_LEN)
-                    if align_bytes != 0:
-                        offset = offset + align_bytes
-                        toc_entry.align_bytes = align_bytes
-                        aligns_used = aligns_used + 1
-                        self._block_lengths.append(align_bytes)
-                        first_block_index = first_block_index + 1
-
-                # Finalise toc entry.
-                toc_entry.offset = offset
-                toc_entry.first_block_index = first_block_index
-                self._block_lengths.extend(toc_entry.pack_lengths)
-
-                # update offsets.
-                offset = offset + len(toc_entry.pack_data)
-                first_block_index = first_block_index + len(toc_entry.pack_lengths)
+        first_block_index = 0
+        self._block_lengths = list()
 
-            if aligns_used != align_blocks:
-                # Try again with 1 less align block.
-                align_blocks = align_blocks - 1
-                aligns_used = -1
+        self._preamble_len = (
+            HEADER_BYTES
+            + len(self._toc_entries) * TOC_ENTRY_BYTES
+            + (block_len_count + align_blocks) * BLOCK_LEN_BYTES
+        )
+        offset = self._preamble_len
 
-            if align_blocks < 0:
-                raise RSFileFormatError(
-                    "Edge case: Cannot create block aligned wem files in archive."
-                )
+        for toc_entry in self._toc_entries:
+            if self._odlc_wem and toc_entry.is_wem_file():
+                # do the alignment thing, correct offsets, block lengths
+                align_bytes = WEM_ALIGN_LEN - (offset % WEM_ALIGN_LEN)
+                offset = offset + align_bytes
+                toc_entry.align_bytes = align_bytes
+                self._block_lengths.append(align_bytes)
+                first_block_index = first_block_index + 1
+
+            # Finalise toc entry.
+            toc_entry.offset = offset
+            toc_entry.first_block_index = first_block_index
+            self._block_lengths.extend(toc_entry.pack_lengths)
+
+            # update offsets.
+            offset = offset + len(toc_entry.pack_data)
+            first_block_index = first_block_index + len(toc_entry.pack_lengths)
 
     def _pack(
         self,
@@ -1083,11 +1177,45 @@ class Welder:
 
         if not self._verify:
             # Finally, the data block to file.
+            buffers: List[memoryview] = list()
             for toc_entry in self._toc_entries:
                 if toc_entry.align_bytes > 0:
-                    self._fd.write(bytes(toc_entry.align_bytes))
+                    buffers.append(memoryview(WEM_ALIGN_BLOCK)[: toc_entry.align_bytes])
+
+                buffers.append(memoryview(toc_entry.pack_data))
+
+            self._write_buffers(buffers)
 
-                self._fd.write(toc_entry.pack_data)
+    def _write_buffers(self, buffers: List[memoryview]) -> None:
+        """Write a list of buffers to the archive file.
+
+        Arguments:
+            buffers {List[memoryview]} -- The buffers to write, in order.
+
+        Where the platform supports it (not Windows), this uses vectored writes on
+        the underlying file descriptor, which cuts the write count from one per buffer
+        to one per WRITEV_MAX_BUFFERS buffers.
+        """
+        if not hasattr(os, "writev"):
+            for buffer in buffers:
+                self._fd.write(buffer)
+            return
+
+        # Push anything sitting in the buffered writer out before bypassing it.
+        self._fd.flush()
+        fileno = self._fd.fileno()
+
+        pending = [x for x in buffers if len(x) > 0]
+        index = 0
+        while index < len(pending):
+            written = os.writev(fileno, pending[index: index + WRITEV_MAX_BUFFERS])
+            # Step past the buffers that were written completely, and trim the
+            # buffer at the point the write stopped (partial writes are allowed).
+            while written > 0 and written >= len(pending[index]):
+                written = written - len(pending[index])
+                index = index + 1
+            if written > 0:
+                pending[index] = pending[index][written:]
 
     def __iter__(self) -> Iterator[int]:
         """Provide iterator for files in the archive excluding the manifest."""
@@ -1119,11 +1247,12 @@ class Welder:
             Any -- AES CTR mode cipher.
 
         """
-        int_init_vector = int.from_bytes(b_init_vector, "big")
         # I'm taking 0x0Ls word here. From the docs, this is a 16 byte counter
         # that starts at whatever iv is (which I suspect to be 0 from 0x0Ls encrypt?)
-        ctr = Counter.new(128, initial_value=int_init_vector, allow_wraparound=False)
-        return AES.new(key, mode=AES.MODE_CTR, counter=ctr)
+        # An empty nonce with a 16 byte initial value gives the same full block
+        # counter as Counter.new(128, ...), without building a Counter object per
+        # file. CTR ciphers are stateful, so can't be shared between files.
+        return AES.new(key, mode=AES.MODE_CTR, nonce=b"", initial_value=b_init_vector)
 
     @staticmethod
     def decrypt_sng(data: bytes, key: bytes) -> bytes:
@@ -1142,11 +1271,11 @@ class Welder:
         Rocksmith Custom Song Toolkit.
 
         """
-        header = data[0:SNG_IV_OFFSET]
-        if header != SNG_HEADER:
+        # startswith avoids creating a header slice on the (normal) success path.
+        if not data.startswith(SNG_HEADER):
             raise RSFileFormatError(
                 f"Unexpected header in '.SNG' file. Expected "
-                f"'0x{SNG_HEADER.hex()}', got '0x{header.hex()}'."
+                f"'0x{SNG_HEADER.hex()}', got '0x{data[0:SNG_IV_OFFSET].hex()}'."
             )
 
         b_init_vector = data[SNG_IV_OFFSET:SNG_ENC_PAYLOAD_OFFSET]
@@ -1188,7 +1317,7 @@ class Welder:
         payload = length + zlib.compress(data, zlib.Z_BEST_COMPRESSION)
 
         # Using 16 zero bytes as IV, in line with other rs decrypt/encrypt utilities
-        b_init_vector = bytes(16)
+        b_init_vector = SNG_ZERO_IV
         cipher = Welder._sng_cipher(key, b_init_vector)
 
         # encrypt and chop off padding
@@ -1197,7 +1326,7 @@ class Welder:
         # This is padding to replace the digital signature attached to the file.
         # The Customs Forge dll bypasses the DSA check, so the value doesn't matter.
         # Follow CFSM convention of 56 bytes of zeros.
-        e_payload = SNG_HEADER + b_init_vector + e_payload + bytes(56)
+        e_payload = SNG_HEADER + b_init_vector + e_payload + SNG_ZERO_SIG
 
         return e_payload
 
@@ -1327,10 +1456,13 @@ def main() -> None:
 
         if args.extract is not None:
             name = args.extract.casefold()
+            targets: Dict[Path, int] = dict()
             for index in psarc:
-                if psarc.arc_name(index).casefold().endswith(name):
+                if psarc.arc_name_casefold(index).endswith(name):
                     file = Path(".").joinpath(Path(psarc.arc_name(index)).name)
-                    file.write_bytes(psarc.arc_data(index))
+                    # Last match wins if two archive files share a name.
+                    targets[file] = index
+            psarc.extract_files(targets)
 
         if args.verify:
             psarc.verify(sys.stdout)
@@ -9,20 +9,47 @@ rsrtools profile manager facility.
 If the module complexity increases, I may re-implement in class form.
 """
 
-# cSpell:ignore CDLC, faves, isalnum, isdigit, prfldb, profilemanager, userdata
+# cSpell:ignore CDLC, faves, isalnum, isdigit, prfldb, profilemanager, userdata, orjson
 
 import argparse
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
 
-import simplejson
+# orjson is an optional (and much faster) parser for song list files. Fall back to
+# simplejson, which is already a dependency, if it isn't installed.
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from simplejson import loads as json_loads  # type: ignore[assignment]
 
 from rsrtools.files.profilemanager import PROFILE_DB_STR, RSProfileManager
 from rsrtools.files.steam import RS_APP_ID, STEAM_REMOTE_DIR, SteamAccounts
 from rsrtools.songlists.config import ListField
-from rsrtools.songlists.database import ArrangementDB
+from rsrtools.songlists.database import DB_NAME, ArrangementDB
 from rsrtools.utils import yes_no_dialog
 
+# Basic song key pattern for use without an arrangement database: one or more
+# (unicode) alphanumerics, plus underscores and hyphens. Same result as
+# str.isalnum() after stripping '_' and '-', but in a single pre-compiled C match.
+SONG_KEY_MATCH = re.compile(r"[\w-]*[^\W_][\w-]*").fullmatch
+
+# Steam account ids are 8 digits.
+ACCOUNT_ID_MATCH = re.compile(r"\d{8}").fullmatch
+
+# Upper case profile db path elements for case insensitive checks in
+# parse_prfldb_path.
+PROFILE_DB_UPPER = PROFILE_DB_STR.upper()
+STEAM_REMOTE_DIR_UPPER = STEAM_REMOTE_DIR.upper()
+RS_APP_ID_UPPER = RS_APP_ID.upper()
+
+# Song list ids accepted by find_paths: song lists 1 to 6 and favorites.
+VALID_LIST_IDS = frozenset(("1", "2", "3", "4", "5", "6", "F"))
+
 # We are going to use the logger all over the place.
 logger: "SimpleLog"
 
@@ -39,15 +66,46 @@ class SimpleLog:
     """
 
     _silent: bool
+    # Log lines held back by batch(), or None if we aren't batching.
+    _buffer: Optional[List[str]]
 
     def __init__(self, silent: bool = False) -> None:
         """Construct simple logger."""
         self._silent = silent
+        self._buffer = None
+        if silent:
+            # Skip the silent check on every call.
+            self.log_this = self._no_log  # type: ignore[method-assign]
 
     def log_this(self, log: str) -> None:
         """Write log."""
-        if not self._silent:
+        if self._buffer is None:
             print(log)
+        else:
+            self._buffer.append(log)
+
+    def _no_log(self, log: str) -> None:
+        """Discard log (replaces log_this for a silent logger)."""
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Hold back logs in a with block and write them out in one call on exit.
+
+        Nested batches are merged into the outermost batch. Held logs are written even
+        if the with block raises an exception.
+        """
+        if self._buffer is not None:
+            yield
+            return
+
+        self._buffer = list()
+        try:
+            yield
+        finally:
+            buffer = self._buffer
+            self._buffer = None
+            if buffer:
+                sys.stdout.write("\n".join(buffer) + "\n")
 
 
 def find_paths(definitions: List[List[str]], working: Path) -> Dict[str, Path]:
@@ -69,31 +127,53 @@ def find_paths(definitions: List[List[str]], working: Path) -> Dict[str, Path]:
     """
     paths: Dict[str, Path] = dict()
 
-    for song_list_id, file_name in definitions:
-        if song_list_id not in ("1", "2", "3", "4", "5", "6", "F"):
-            raise ValueError(
-                f"Undefined list id '{song_list_id}', should be a number from '1' to "
-                f"'6' or 'F'."
-            )
-
-        try:
-            song_file = working.joinpath(file_name).resolve(True)
-        except FileNotFoundError:
-            # try again, but allow a fail on this one
-            song_file = Path(file_name).resolve(True)
+    with logger.batch():
+        for song_list_id, file_name in definitions:
+            if song_list_id not in VALID_LIST_IDS:
+                raise ValueError(
+                    f"Undefined list id '{song_list_id}', should be a number from '1' "
+                    f"to '6' or 'F'."
+                )
 
-        if song_list_id in paths:
-            logger.log_this(
-                f"WARNING: You have specified song list '{song_list_id}' more than "
-                f"once."
-                f"\n  Are you sure you meant to to this?"
-            )
-        paths[song_list_id] = song_file
-        logger.log_this(f"Found json file for song list '{song_list_id}'")
+            # Look in the working directory first, then relative to the current
+            # directory. The strict resolve raises FileNotFoundError if neither exists.
+            song_file = working.joinpath(file_name)
+            if not song_file.is_file():
+                song_file = Path(file_name)
+            song_file = song_file.resolve(True)
+
+            if paths.get(song_list_id) is not None:
+                logger.log_this(
+                    f"WARNING: You have specified song list '{song_list_id}' more than "
+                    f"once."
+                    f"\n  Are you sure you meant to to this?"
+                )
+            paths[song_list_id] = song_file
+            logger.log_this(f"Found json file for song list '{song_list_id}'")
 
     return paths
 
 
+@lru_cache(maxsize=4)
+def _song_key_set(
+    working: Path, db_mtime: float  # pylint: disable=unused-argument
+) -> Optional[FrozenSet[str]]:
+    """Return the set of song keys in the arrangement database, or None if no data.
+
+    Arguments:
+        working {Path} -- The working directory containing the arrangement database.
+        db_mtime {float} -- Modification time of the database file. Only used as part
+            of the cache key, so that the set is rebuilt if the database changes.
+
+    """
+    with ArrangementDB(working) as arr:
+        if arr.has_arrangement_data:
+            # Validators are sets, for constant time membership tests.
+            return arr.list_validator(ListField.SONG_KEY)[ListField.SONG_KEY]
+
+    return None
+
+
 def validate_song_keys(song_lists_dict: Dict[str, List[str]], working: Path) -> None:
     """Validate song lists against string pattern or list of available song keys.
 
@@ -107,23 +187,19 @@ def validate_song_keys(song_lists_dict: Dict[str, List[str]], working: Path) ->
         ValueError -- If any value fails.
 
     """
-    # get a song key list from Arrangement db if possible
-    arr = ArrangementDB(working)
-    if arr.has_arrangement_data:
-        key_list: Optional[List[str]] = arr.list_validator(ListField.SONG_KEY)[
-            ListField.SONG_KEY
-        ]
+    # get a song key set from Arrangement db if possible
+    try:
+        db_mtime = working.joinpath(DB_NAME).stat().st_mtime
+    except FileNotFoundError:
+        key_set = None
     else:
-        key_list = None
+        key_set = _song_key_set(working, db_mtime)
 
-    if key_list is None:
+    if key_set is None:
         # do the most basic checks possible
-        # create translation dictionary of allowed non-alphanumeric characters
-        # allows easy extension if needed
-        allowed = str.maketrans({"_": None, "-": None})
-
+        # Extend SONG_KEY_MATCH if other characters need to be allowed.
         for song_list_id, song_list in song_lists_dict.items():
-            failed = [x for x in song_list if not x.translate(allowed).isalnum()]
+            failed = [x for x in song_list if not SONG_KEY_MATCH(x)]
             if failed:
                 raise ValueError(
                     f"Song Key(s) for song list '{song_list_id}' contain invalid "
@@ -133,7 +209,7 @@ def validate_song_keys(song_lists_dict: Dict[str, List[str]], working: Path) ->
 
     else:
         for song_list_id, song_list in song_lists_dict.items():
-            failed = [x for x in song_list if x not in key_list]
+            failed = [x for x in song_list if x not in key_set]
             if failed:
                 raise ValueError(
                     f"Song Key(s) for song list '{song_list_id}' are not in the "
@@ -144,6 +220,52 @@ def validate_song_keys(song_lists_dict: Dict[str, List[str]], working: Path) ->
     logger.log_this("All song lists validated.")
 
 
+def _load_song_list(file_path: Path) -> List[str]:
+    """Return the song list read from a json file, after structure checks and clean up.
+
+    Arguments:
+        file_path {Path} -- Path to a json song list file.
+
+    Returns:
+        List[str] -- The song keys in the file. See read_lists for details.
+
+    """
+    # Song list files are small (one short key per song), so a single parse call
+    # is cheaper than a streaming parser, and lets us check that the top level
+    # object is a list before looking at any members.
+    with open(file_path, "rt", encoding="locale") as file_handle:
+        song_list = json_loads(file_handle.read())
+
+    # structure checks - could have used a schema for this.
+    # because I'm a bit lazy here, might also fail if a song key
+    # is pure digits and has been converted to a number on the way in
+    # We can tidy this up if it ever happens.
+    if not isinstance(song_list, list):
+        raise TypeError(
+            f"Invalid format in file '{file_path.name}'."
+            f"\n  This should be a JSON list of strings, but I found "
+            f"a {type(song_list)}."
+        )
+
+    # Type check and filter in a single pass over the list.
+    song_keys: List[str] = list()
+    for val in song_list:
+        if not isinstance(val, str):
+            raise TypeError(
+                f"Invalid song list member in file '{file_path.name}'."
+                f"\n  This should be a JSON list of strings, but I found "
+                f"a member with {type(val)}."
+            )
+
+        # just to be sure, clean out white space and empty strings silently.
+        # Intern keys so that songs repeated across lists share one string.
+        if val.strip():
+            song_keys.append(sys.intern(val))
+
+    # Drop repeated song keys, keeping the first occurrence of each.
+    return list(dict.fromkeys(song_keys))
+
+
 def read_lists(paths: Dict[str, Path]) -> Dict[str, List[str]]:
     """Return a dictionary of song lists read from file.
 
@@ -153,40 +275,29 @@ def read_lists(paths: Dict[str, Path]) -> Dict[str, List[str]]:
     Returns:
         Dict[str, List[str]] -- The keys are a string song list id ('1' to '6' or 'F'),
             and the value lists contains the song keys to be written to that list.
+            Repeated song keys are removed from each list (preserving order).
 
+    The files are read in parallel. If more than one file fails the structure checks,
+    the exception for the first failing file (in paths order) is raised.
     """
     sl_dict: Dict[str, List[str]] = dict()
-    for song_list_id, file_path in paths.items():
-        logger.log_this(
-            f"Reading file '{file_path.name}'' for song list '{song_list_id}'."
-        )
-
-        with open(file_path, "rt", encoding="locale") as file_handle:
-            song_list = simplejson.load(file_handle)
+    if not paths:
+        return sl_dict
 
-        # structure checks - could have used a schema for this.
-        # because I'm a bit lazy here, might also fail if a song key
-        # is pure digits and has been converted to a number on the way in
-        # We can tidy this up if it ever happens.
-        if not isinstance(song_list, list):
-            raise TypeError(
-                f"Invalid format in file '{file_path.name}'."
-                f"\n  This should be a JSON list of strings, but I found "
-                f"a {type(song_list)}."
+    with logger.batch():
+        for song_list_id, file_path in paths.items():
+            logger.log_this(
+                f"Reading file '{file_path.name}'' for song list '{song_list_id}'."
             )
 
-        for val in song_list:
-            if not isinstance(val, str):
-                raise TypeError(
-                    f"Invalid song list member in file '{file_path.name}'."
-                    f"\n  This should be a JSON list of strings, but I found "
-                    f"a member with {type(val)}."
-                )
-
-        # just to be sure, clean out white space and empty strings silently.
-        song_list = [x for x in song_list if x.strip() != ""]
-
-        sl_dict[song_list_id] = song_list
+    # Reading is I/O bound, so threads overlap the reads for multiple files.
+    # executor.map returns results in paths order, and re-raises any exception
+    # from _load_song_list when we get to the failing file.
+    with ThreadPoolExecutor(max_workers=min(8, len(paths))) as executor:
+        for song_list_id, song_keys in zip(
+            paths.keys(), executor.map(_load_song_list, paths.values())
+        ):
+            sl_dict[song_list_id] = song_keys
 
     logger.log_this("All song list files passed structure tests.")
     return sl_dict
@@ -300,6 +411,14 @@ def import_faves_by_replace(
     """
     song_list = song_list_dict.get("F", None)
     if song_list is not None:
+        # Skip the update if the profile already has this favorites list. Otherwise
+        # the profile would be marked dirty and saved for no change.
+        current = profile_mgr.get_json_subtree(
+            profile, ("FavoritesListRoot", "FavoritesList")
+        )
+        if current == song_list:
+            return
+
         # We have a Favorites list to update, so let's do it!
         # This is a easy as it gets - replace the song list in the profile, and as a
         # by product, set_json_subtree marks the profile as dirty for saving.
@@ -329,8 +448,11 @@ def import_song_lists_by_mutable(
     list_of_song_lists = profile_mgr.get_json_subtree(
         profile, ("SongListsRoot", "SongLists")
     )
+    modified = False
     for key, song_list in song_list_dict.items():
-        if key.isdigit() and 1 <= int(key) <= 6:
+        # Song list ids are the single characters '1' to '6' (see VALID_LIST_IDS), so
+        # compare characters and get the list index from the character code.
+        if len(key) == 1 and "1" <= key <= "6":
             # We have a song list to update, so let's do it!
             # We already have the profile list of song lists. As this is a mutable,
             # any changes in the lists are also reflected in the profile instance data.
@@ -339,11 +461,13 @@ def import_song_lists_by_mutable(
             # statements:
             #   list_of_song_lists = profile_json["SongListsRoot"]["SongLists"]
             #   list_of_song_lists[key-1] = song_list
-            list_of_song_lists[int(key) - 1] = song_list
+            list_of_song_lists[ord(key) - ord("1")] = song_list
+            modified = True
 
-            # While we know we have modified the instance data, the profile manager
-            # doesn't. So we tell it explicitly.
-            profile_mgr.mark_as_dirty(profile)
+    if modified:
+        # While we know we have modified the instance data, the profile manager
+        # doesn't. So we tell it explicitly (once, after all of the updates).
+        profile_mgr.mark_as_dirty(profile)
 
 
 def parse_prfldb_path(raw_path: str) -> Tuple[str, str]:
@@ -357,11 +481,12 @@ def parse_prfldb_path(raw_path: str) -> Tuple[str, str]:
             the file in the path.
 
     """
-    # Eliminate relative path elements, get the path
-    path = Path(raw_path).resolve(False)
+    # Eliminate relative path elements and split the path into parts. Pad the front so
+    # that short paths fail the element checks below rather than raise an IndexError.
+    parts = ("", "", "") + Path(raw_path).resolve(False).parts
 
-    unique_id = path.name
-    if not unique_id.upper().endswith(PROFILE_DB_STR.upper()):
+    unique_id = parts[-1]
+    if not unique_id.upper().endswith(PROFILE_DB_UPPER):
         raise ValueError(
             f"Profile db path must end with file name "
             f"'*<unique_id>{PROFILE_DB_STR}'."
@@ -371,19 +496,19 @@ def parse_prfldb_path(raw_path: str) -> Tuple[str, str]:
 
     logger.log_this(f"Found unique id '{unique_id}' from path.")
 
-    path = path.parent
-    for test_id in (STEAM_REMOTE_DIR, RS_APP_ID):
-        if path.name.upper() == test_id.upper():
-            path = path.parent
-        else:
+    for test_id, test_upper, part in (
+        (STEAM_REMOTE_DIR, STEAM_REMOTE_DIR_UPPER, parts[-2]),
+        (RS_APP_ID, RS_APP_ID_UPPER, parts[-3]),
+    ):
+        if part.upper() != test_upper:
             raise ValueError(
                 f"Path to profile id must have the following elements:"
                 f"<Steam account id>\\{RS_APP_ID}\\{STEAM_REMOTE_DIR}\\<profile name>."
                 f"\nFailed on element '{test_id}'."
             )
 
-    account_id = path.name
-    if len(account_id) != 8 or not account_id.isdigit():
+    account_id = parts[-4]
+    if not ACCOUNT_ID_MATCH(account_id):
         raise ValueError(
             f"Steam account id must be 8 digits. '{account_id}' is invalid."
         )
@@ -393,8 +518,12 @@ def parse_prfldb_path(raw_path: str) -> Tuple[str, str]:
     return account_id, unique_id
 
 
-def main() -> None:
-    """Provide command line entry point for rsm importer."""
+@lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
+    """Return the command line argument parser for the rsm importer.
+
+    The parser is built once and reused if main is called more than once.
+    """
     parser = argparse.ArgumentParser(
         description="Command line interface for loading song lists/set lists generated "
         "by rs-manager into Rocksmith."
@@ -477,7 +606,12 @@ def main() -> None:
         metavar=("list_id", "song_file"),
     )
 
-    args = parser.parse_args()
+    return parser
+
+
+def main() -> None:
+    """Provide command line entry point for rsm importer."""
+    args = _build_parser().parse_args()
 
     # Share the logger everywhere.
     global logger  # pylint: disable=global-statement
@@ -540,13 +674,16 @@ def main() -> None:
 
     # Save the files into the update folder in the working directory
     # and then move them to the Steam account
-    dialog = (
-        f"Please confirm that you want to update song lists in profile '{profile}' of "
-        f"Steam account:"
-        f"\n{profile_mgr.steam_description(profile_mgr.steam_account_id)}"
-    )
+    if args.silent:
+        do_write = True
+    else:
+        do_write = yes_no_dialog(
+            f"Please confirm that you want to update song lists in profile "
+            f"'{profile}' of Steam account:"
+            f"\n{profile_mgr.steam_description(profile_mgr.steam_account_id)}"
+        )
 
-    if args.silent or yes_no_dialog(dialog):
+    if do_write:
         profile_mgr.write_files()
         profile_mgr.move_updates_to_steam(profile_mgr.steam_account_id)
 
@@ -3,7 +3,7 @@
 """Provide type aliases, shared strings and JSON schemas used by song list creator."""
 
 from enum import Enum
-from typing import Optional
+from typing import Dict
 
 
 # We use some SQL field information in constants, so declare these here (may move to a
@@ -21,20 +21,10 @@ class SQLField(Enum):
         # Jan 2024 - I don't think this method is used at all? Safe to delete?
         # for now, have made the method name consistent with other methods.
         # Previous version had no underscores.
-        ret_val: Optional[SQLField] = None
-        for field_class in cls.__subclasses__():
-            try:
-                ret_val = field_class(value)
-                # found it if we got here!
-                break
-            except ValueError:
-                # skip to the next subclass
-                pass
-
-        if ret_val is None:
-            raise ValueError(f"{value} is a not a valid subclass of SQLField")
-
-        return ret_val
+        try:
+            return SQL_FIELDS[value]
+        except KeyError as k_e:
+            raise ValueError(f"{value} is a not a valid subclass of SQLField") from k_e
 
     @classmethod
     def report_field_values(cls) -> None:
@@ -87,3 +77,12 @@ class RangeField(SQLField):
     SONG_LENGTH = "SongLength"
     # Modified time of the underlying psarc
     LAST_MODIFIED = "LastModified"
+
+
+# Lookup of SQLField subclass members by value, for SQLField.get_sub_class. This
+# relies on there being no repeated values between the subclasses.
+SQL_FIELDS: Dict[str, SQLField] = {
+    field.value: field
+    for field_class in SQLField.__subclasses__()
+    for field in field_class
+}
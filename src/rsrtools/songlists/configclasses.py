@@ -5,12 +5,15 @@
 # cSpell: ignore pydantic, parameterise
 
 from enum import Enum
+from functools import cached_property, lru_cache
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, List, Tuple, Union, Optional
+from typing import Any, Dict, FrozenSet, List, Literal, Tuple, Union, Optional
 import tomllib
 
-from dataclasses import field, asdict, replace  # cSpell: disable-line
-from pydantic import ConfigDict
+from dataclasses import field, replace  # cSpell: disable-line
+from pydantic import ConfigDict, TypeAdapter
 from pydantic.dataclasses import dataclass
 
 import tomli_w
@@ -20,6 +23,9 @@ from rsrtools.songlists.config import RangeField, ListField, SQLField
 
 # SQL Clause type alias - SQL text + Value tuple for substitution
 SQLClause = Tuple[str, Tuple[Union[str, int, float], ...]]
+# Sub-filter clause type alias - estimated fraction of matching records, SQL text and
+# value list for substitution.
+SubClause = Tuple[float, str, List[Union[str, int, float]]]
 
 # These string constants are used to parameterise the default TOML.
 # They should be the same as the attribute names in the dataclasses below.
@@ -549,6 +555,73 @@ class FilterMode(Enum):
     OR = "OR"
 
 
+# SQL text fragments for WHERE clause construction.
+WHERE_PREFIX = "  WHERE\n    "
+# Sub-filter joiners for each filter mode, keyed by the FilterMode value.
+MODE_JOINERS: Dict[str, str] = {
+    mode.value: f"\n    {mode.value} " for mode in FilterMode
+}
+# Range joiners for include/exclude range sub-filters.
+RANGE_INCLUDE_JOINER = "\n      OR "
+RANGE_EXCLUDE_JOINER = "\n      AND "
+# Range clause text for each range field and include value (True/False).
+RANGE_CLAUSE_TEXT: Dict[Tuple[RangeField, bool], str] = {
+    (field_type, include): (
+        f"{field_type.value} {'' if include else 'NOT '}BETWEEN ? AND ?"
+    )
+    for field_type in RangeField
+    for include in (True, False)
+}
+# List clause text up to the opening bracket of the value list, for each list field and
+# include value.
+LIST_CLAUSE_PREFIX: Dict[Tuple[ListField, bool], str] = {
+    (field_type, include): f"{field_type.value} {'' if include else 'NOT '}IN ("
+    for field_type in ListField
+    for include in (True, False)
+}
+
+
+@lru_cache(maxsize=None)
+def _q_marks(count: int) -> str:
+    """Return a comma separated string of count question marks for value substitution.
+
+    Arguments:
+        count {int} -- The number of question marks.
+
+    """
+    return ", ".join("?" * count)
+
+
+@lru_cache(maxsize=None)
+def _range_field(field_name: Union[SQLField, str]) -> RangeField:
+    """Return the RangeField for field_name, which may be a value or RangeField member.
+
+    Raises ValueError if field_name is not a RangeField value. As the enum members are
+    fixed, the cache is bounded by the number of fields.
+    """
+    return RangeField(field_name)
+
+
+@lru_cache(maxsize=None)
+def _list_field(field_name: Union[SQLField, str]) -> ListField:
+    """Return the ListField for field_name, which may be a value or ListField member.
+
+    Raises ValueError if field_name is not a ListField value. As the enum members are
+    fixed, the cache is bounded by the number of fields.
+    """
+    return ListField(field_name)
+
+
+@lru_cache(maxsize=1)
+def _default_config_dict() -> Dict[str, Any]:
+    """Return the parsed default TOML configuration.
+
+    The TOML is only parsed once. The dictionary is shared between callers, so it must
+    not be modified (the dataclass constructors copy the data during validation).
+    """
+    return tomllib.loads(DEFAULT_TOML)
+
+
 @dataclass
 class Settings:
     """General settings for song list creator.
@@ -591,6 +664,33 @@ class SubFilter:
     # instance variables
     include: bool
 
+    def clause(
+        self,
+        field_name: Union[RangeField, ListField],
+        list_validator: Dict[ListField, FrozenSet[str]],
+    ) -> SubClause:
+        """Create the SQL clause for the sub-filter.
+
+        Arguments:
+            field_name {Union[RangeField, ListField]} -- The target field for the
+                clause.
+            list_validator {Dict[ListField, FrozenSet[str]]} -- For each list field in
+                the dictionary, the set of valid values for this field.
+
+        Raises:
+            RSFilterError -- Always, as subclasses must implement this method.
+
+        Returns:
+            Tuple[float, str, List[Union[str, int, float]]] -- SubClause, the estimated
+                fraction of records matching the clause, the clause text and the list of
+                values to be substituted into the clause.
+
+        """
+        raise RSFilterError(
+            f"WHERE clause error: Unrecognised sub_filter type"
+            f"\nGot {type(self)}, expected ListSubFilter or RangeSubFilter."
+        )
+
 
 @dataclass
 class RangeSubFilter(SubFilter):
@@ -600,6 +700,7 @@ class RangeSubFilter(SubFilter):
         ranges {List[List[float]]} -- A list of low/high value range pairs of the form:
             [[low1, high1], [low2, high2], ...]
         range_clause: returns the range clause and values tuple for the filter.
+        clause: returns the estimate, range clause and values for Filter.where_clause.
 
     The low/high pairs are used to build SQL IN BETWEEN queries.
 
@@ -625,6 +726,28 @@ class RangeSubFilter(SubFilter):
     # ranges: List[List[Union[int, float]]]
     ranges: List[List[float]]
 
+    def clause(
+        self,
+        field_name: Union[RangeField, ListField],
+        list_validator: Dict[ListField, FrozenSet[str]],
+    ) -> SubClause:
+        """Create the SQL clause for a range sub-filter (see SubFilter.clause).
+
+        list_validator is not used by range sub-filters. As there is no estimate for
+        the number of matches on ranges, the estimated fraction is always 1.0.
+        """
+        try:
+            field_type = _range_field(field_name)
+        except ValueError as v_e:
+            raise RSFilterError(
+                f"WHERE clause error: Invalid field type ({field_name}) "
+                f"for range type sub-filter.\nThis should be a member of "
+                f"RangeField Enum. "
+            ) from v_e
+
+        sub_text, range_list = self.range_clause(field_type)
+        return 1.0, sub_text, list(range_list)
+
     def range_clause(
         self, field_name: RangeField
     ) -> Tuple[str, List[Union[float, int]]]:
@@ -655,11 +778,8 @@ class RangeSubFilter(SubFilter):
             AND PlayedCount NOT BETWEEN ? AND ?
 
         """
-        ret_values: List[Union[float, int]] = list()
-        text_list: List[str] = list()
-
         # Convert any constants to enum type.
-        field_type = RangeField(field_name)
+        field_type = _range_field(field_name)
 
         if not self.ranges:
             raise RSFilterError(
@@ -667,51 +787,74 @@ class RangeSubFilter(SubFilter):
                 f"field type {field_type.value}."
             )
 
+        # Validation and tidying are done once per instance (see _range_pairs).
+        try:
+            range_pairs = self._range_pairs
+        except RSFilterError as exc:
+            raise RSFilterError(
+                f"WHERE clause error: Range field type '{field_type.value}' {exc}"
+            ) from exc
+        except ValueError as v_e:
+            raise ValueError(
+                f"WHERE clause error: Range field type '{field_type.value}' {v_e}"
+            ) from v_e
+
         if self.include:
-            not_text = ""
-            joiner = "\n      OR "
+            joiner = RANGE_INCLUDE_JOINER
         else:
-            not_text = "NOT "
-            joiner = "\n      AND "
+            joiner = RANGE_EXCLUDE_JOINER
+
+        # and finally the SQL
+        range_text = RANGE_CLAUSE_TEXT[field_type, self.include]
+        sql_text = f"({joiner.join([range_text] * len(range_pairs))})"
+
+        return sql_text, list(chain.from_iterable(range_pairs))
+
+    @cached_property
+    def _range_pairs(self) -> Tuple[Tuple[Union[float, int], Union[float, int]], ...]:
+        """Return the validated ranges as (low, high) pairs.
+
+        Raises:
+            RSFilterError -- If a range is not a numeric [low, high] pair.
+            ValueError -- If a range value is negative.
 
+        Returns:
+            Tuple[Tuple[Union[float, int], Union[float, int]], ...] -- The ranges, with
+                each pair sorted low to high, and integer valued pairs converted to
+                int.
+
+        The result is cached, as the ranges are not modified after configuration load.
+        Error messages are completed by range_clause, which knows the field type.
+        """
+        range_pairs: List[Tuple[Union[float, int], Union[float, int]]] = list()
         for value_pair in self.ranges:
             if not isinstance(value_pair, list) or len(value_pair) != 2:
-                raise RSFilterError(
-                    f"WHERE clause error: Range field type '{field_type.value}' "
-                    f"expected [low, high] pair, got {value_pair}."
-                )
+                raise RSFilterError(f"expected [low, high] pair, got {value_pair}.")
 
             if not all(isinstance(x, (int, float)) for x in value_pair):
                 raise RSFilterError(
-                    f"WHERE clause error: Range field type {field_type} expects "
-                    f"numeric pairs of values to define range. Got {value_pair}."
+                    f"expects numeric pairs of values to define range. "
+                    f"Got {value_pair}."
                 )
 
             if any(x < 0 for x in value_pair):
                 raise ValueError(
-                    f"WHERE clause error: Range field type {field_type} expects "
-                    f"numeric pairs of values to >= 0 to define range."
+                    f"expects numeric pairs of values to >= 0 to define range."
                     f"\nGot {value_pair}."
                 )
 
             # silent tidy.
-            low_val = min(value_pair)
-            high_val = max(value_pair)
+            low_val: Union[float, int] = min(value_pair)
+            high_val: Union[float, int] = max(value_pair)
 
             # temporary fix until I can validate and assign Union[int, float] correctly
             if low_val.is_integer() and high_val.is_integer():
                 low_val = int(low_val)
                 high_val = int(high_val)
 
-            # and finally the SQL
-            text_list.append(f"{field_type.value} {not_text}BETWEEN ? AND ?")
-            ret_values.append(low_val)
-            ret_values.append(high_val)
-
-        sql_text = joiner.join(text_list)
-        sql_text = f"({sql_text})"
+            range_pairs.append((low_val, high_val))
 
-        return sql_text, ret_values
+        return tuple(range_pairs)
 
 
 @dataclass
@@ -722,6 +865,7 @@ class ListSubFilter(SubFilter):
         values {List[str} -- A list of string values that will be used to build the
             filter.
         list_clause: returns the list clause and values tuple for the filter.
+        clause: returns the estimate, list clause and values for Filter.where_clause.
 
     The values are used to build SQL IN queries.
 
@@ -735,15 +879,40 @@ class ListSubFilter(SubFilter):
     # instance variables
     values: List[str]
 
+    def clause(
+        self,
+        field_name: Union[RangeField, ListField],
+        list_validator: Dict[ListField, FrozenSet[str]],
+    ) -> SubClause:
+        """Create the SQL clause for a list sub-filter (see SubFilter.clause).
+
+        The estimated fraction of matching records is the fraction of the valid values
+        for the field that appear in the clause (or its complement for exclusions).
+        """
+        try:
+            field_type = _list_field(field_name)
+        except ValueError as v_e:
+            raise RSFilterError(
+                f"WHERE clause error: Invalid field type ({field_name}) "
+                f"for list type sub-filter.\nThis should be a member of "
+                f"ListField Enum."
+            ) from v_e
+
+        sub_text, value_list = self.list_clause(field_type, list_validator)
+        estimate = len(value_list) / len(list_validator[field_type])
+        if not self.include:
+            estimate = 1.0 - estimate
+        return estimate, sub_text, list(value_list)
+
     def list_clause(
-        self, field_name: ListField, list_validator: Dict[ListField, List[str]]
+        self, field_name: ListField, list_validator: Dict[ListField, FrozenSet[str]]
     ) -> Tuple[str, List[str]]:
         """Create SQL list field clause.
 
         Arguments:
             field_name {ListField} -- The list field target for the clause.
-            list_validator {Dict[ListField, List[str]]} -- For each list field in the
-                dictionary, a list of valid values for this field.
+            list_validator {Dict[ListField, FrozenSet[str]]} -- For each list field in
+                the dictionary, the set of valid values for this field.
 
         Raises:
             RSFilterError -- If a filter value is not valid (doesn't appear in the
@@ -761,15 +930,13 @@ class ListSubFilter(SubFilter):
 
         """
         # Convert any constants to enum type.
-        field_type = ListField(field_name)
-
-        values: List[str] = list()
+        field_type = _list_field(field_name)
 
         # Silently ignore invalid values (better then the old message of
-        # failing unceremoniously)
-        for value in self.values:
-            if value in list_validator[field_type]:
-                values.append(value)
+        # failing unceremoniously). Set membership keeps this linear in the number of
+        # values.
+        valid_values = list_validator[field_type]
+        values = [value for value in self.values if value in valid_values]
 
         if not values:
             raise RSFilterError(
@@ -777,17 +944,8 @@ class ListSubFilter(SubFilter):
                 f"field type {field_type.value}."
             )
 
-        if len(values) > 1:
-            q_marks = "?, " * (len(values) - 1)
-        else:
-            q_marks = ""
-
-        if self.include:
-            not_text = ""
-        else:
-            not_text = "NOT "
-
-        sql_text = f"{field_type.value} {not_text}IN ({q_marks}?)"
+        prefix = LIST_CLAUSE_PREFIX[field_type, self.include]
+        sql_text = f"{prefix}{_q_marks(len(values))})"
 
         return sql_text, values
 
@@ -809,10 +967,10 @@ class Filter:
         base {str} -- The name of another named filter that will provides the base data
             for this filter.
 
-        mode {FilterMode} -- Defines the logic for combining sub_filters. For
-            FilterMode.AND, the filter will return only records that match all of the
-            the sub-filters, while FilterMode.OR will return all records that match any
-            of the sub-filters.
+        mode {str} -- Defines the logic for combining sub_filters, and must be a
+            FilterMode value. For "AND", the filter will return only records that match
+            all of the the sub-filters, while "OR" will return all records that match
+            any of the sub-filters.
 
     Note: changes in attribute names should be reflected in default TOML.
     """
@@ -822,14 +980,18 @@ class Filter:
         Union[RangeField, ListField], Union[RangeSubFilter, ListSubFilter]
     ] = field(default_factory=dict)
     base: str = ""
-    mode: FilterMode = FilterMode.AND
+    # The values of FilterMode. A Literal validates as a plain string lookup, and
+    # keeps the default and validated values the same type.
+    mode: Literal["AND", "OR"] = "AND"
 
-    def where_clause(self, list_validator: Dict[ListField, List[str]]) -> SQLClause:
+    def where_clause(
+        self, list_validator: Dict[ListField, FrozenSet[str]]
+    ) -> SQLClause:
         """Return a SQL WHERE clause for the filter.
 
         Arguments:
-            list_validator {Dict[ListField, List[str]]} -- For each list field in the
-                dictionary, a list of valid values for this field.
+            list_validator {Dict[ListField, FrozenSet[str]]} -- For each list field in
+                the dictionary, the set of valid values for this field.
 
         Raises:
             RSFilterError -- For validation errors in the filter definition.
@@ -840,49 +1002,14 @@ class Filter:
                 filter.
 
         """
-        field_type: SQLField
-        sub_clauses: List[str] = list()
-        where_values: List[Union[str, int, float]] = list()
+        # Each sub clause is a tuple of the estimated fraction of records that will
+        # match the sub clause, the clause text and the clause values.
+        sub_clauses: List[SubClause] = list()
 
         # work through each sub filter in the list.
         for field_name, sub_filter in self.sub_filters.items():
             try:
-                if isinstance(sub_filter, RangeSubFilter):
-                    try:
-                        field_type = RangeField(field_name)
-                    except ValueError as v_e:
-                        raise RSFilterError(
-                            f"WHERE clause error: Invalid field type ({field_name}) "
-                            f"for range type sub-filter.\nThis should be a member of "
-                            f"RangeField Enum. "
-                        ) from v_e
-
-                    sub_text, range_list = sub_filter.range_clause(field_type)
-                    where_values.extend(range_list)
-                    sub_clauses.append(sub_text)
-
-                elif isinstance(sub_filter, ListSubFilter):
-                    try:
-                        field_type = ListField(field_name)
-                    except ValueError as v_e:
-                        raise RSFilterError(
-                            f"WHERE clause error: Invalid field type ({field_name}) "
-                            f"for list type sub-filter.\nThis should be a member of "
-                            f"ListField Enum."
-                        ) from v_e
-
-                    sub_text, value_list = sub_filter.list_clause(
-                        field_type, list_validator
-                    )
-                    where_values.extend(value_list)
-                    sub_clauses.append(sub_text)
-
-                else:
-                    raise RSFilterError(
-                        f"WHERE clause error: Unrecognised sub_filter type"
-                        f"\nGot {type(sub_filter)}, expected ListSubFilter or "
-                        f"RangeSubFilter."
-                    )
+                sub_clauses.append(sub_filter.clause(field_name, list_validator))
 
             except RSFilterError as exc:
                 raise RSFilterError(
@@ -890,17 +1017,22 @@ class Filter:
                 ) from exc
 
         try:
-            mode_text = FilterMode(self.mode).value
-        except ValueError as v_e:
+            joiner = MODE_JOINERS[self.mode]
+        except KeyError as k_e:
             raise RSFilterError(
                 f"WHERE clause error: Invalid mode '{self.mode}''. Should be a member "
                 f"of FilterMode Enum."
-            ) from v_e
+            ) from k_e
+
+        if joiner is MODE_JOINERS[FilterMode.AND.value]:
+            # Put the most selective sub clauses first, so that SQLite can discard
+            # non-matching records as early as possible. The sort is stable, so clauses
+            # without estimates keep their definition order.
+            sub_clauses.sort(key=itemgetter(0))
 
-        # This is clumsy, but allows dumping of SQL for debugging.
-        where_text = f"\n    {mode_text} "
-        where_text = where_text.join(sub_clauses)
-        where_text = f"  WHERE\n    {where_text}"
+        # The line breaks allow dumping of SQL for debugging.
+        where_text = f"{WHERE_PREFIX}{joiner.join(text for _, text, _ in sub_clauses)}"
+        where_values = chain.from_iterable(values for _, _, values in sub_clauses)
 
         return where_text, tuple(where_values)
 
@@ -958,7 +1090,7 @@ class Configuration:
             # No filter configurations, so set up a default set.
             # This will apply if data is missing or for a default setup.
             # Should be OK as python strings are all in UTF-8 already?
-            configuration = replace(configuration, **tomllib.loads(DEFAULT_TOML))
+            configuration = replace(configuration, **_default_config_dict())
 
         return configuration
 
@@ -971,6 +1103,13 @@ class Configuration:
         # Hopefully using sorted with tomli-w allows me keep filter structures
         # together in the toml? If not, figure out what needs to be done to
         # emulate the previous version using toml.
+        # The pydantic serializer builds the dictionary in compiled code (much faster
+        # than the recursive copy in dataclasses.asdict), and json mode converts enums
+        # to their values, which tomli-w can serialise.
+        toml = CONFIGURATION_ADAPTER.dump_python(self, mode="json")
         with toml_path.open("wb") as file_handle:
-            toml = dict(sorted(asdict(self).items()))
-            tomli_w.dump(toml, file_handle)
+            tomli_w.dump(dict(sorted(toml.items())), file_handle)
+
+
+# Serializer for writing configurations to TOML.
+CONFIGURATION_ADAPTER = TypeAdapter(Configuration)
@@ -12,27 +12,41 @@ For command line options (database setup, reporting), run
     'python rsrtools.songlists.database.py -h'.
 """
 
-# cSpell:ignore stat, profilemanager
+# cSpell:ignore stat, profilemanager, lxml, etree
 # pylint: disable=too-many-lines
 
+import re
 import sqlite3
+import sys
 import argparse
 
-import xml.etree.ElementTree as eTree  # cSpell: disable-line
+# lxml is optional, and is much faster than ElementTree for large CFSM files.
+try:
+    from lxml import etree as eTree
+except ImportError:
+    import xml.etree.ElementTree as eTree  # type: ignore[no-redef]
 
 from pathlib import Path
+from types import TracebackType
 
 # I'd prefer to import OrderedDict from typing, but this isn't quite working as at 3.7.3
 from collections import OrderedDict
+from operator import itemgetter
 from typing import (
     cast,
+    Any,
     Callable,
     Dict,
+    FrozenSet,
     List,
+    Literal,
     MutableMapping,
     Optional,
+    Sequence,
+    Set,
     TextIO,
     Tuple,
+    Type,
     Union,
 )
 
@@ -44,13 +58,24 @@ from rsrtools.files.profilemanager import RSProfileManager, JSON_path_type
 from rsrtools.songlists.scanner import Scanner
 
 # type aliases
-ListValidator = Dict[ListField, List[str]]
+ListValidator = Dict[ListField, FrozenSet[str]]
 # This gets around problem with declaring OrderedDicts in 3.7.3. This will hopefully be
 # sorted in the next release.
 SQLTableDict = MutableMapping[SQLField, str]
 
 # database file name
 DB_NAME = "RS_Arrangements.sqlite"
+# PRAGMAs for bulk table loads. The database is a cache of data from the psarc files
+# and player profiles, so we can trade a little durability for speed.
+BULK_LOAD_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL;"
+    "\nPRAGMA temp_store = MEMORY;"
+    "\nPRAGMA cache_size = -64000;"
+)
+# Number of rows fetched per batch when printing report queries.
+REPORT_FETCH_SIZE = 4096
+# Maximum number of song list SQL generators cached by ArrangementDB.
+SQL_CACHE_SIZE = 16
 # base table name for all filter queries.
 TEMP_TABLE_BASE = "RSRTempTable"
 
@@ -119,6 +144,17 @@ SONG_LIST_FIELDS: SQLTableDict = OrderedDict(
     ]
 )
 
+# SQL expressions for player profile fields that are calculated from other fields
+# rather than read directly from the profile.
+PROFILE_CALCULATED_FIELDS: Dict[SQLField, str] = {
+    RangeField.SA_PLAYED_COUNT: (
+        f":{RangeField.SA_EASY_COUNT.value} + :{RangeField.SA_MEDIUM_COUNT.value}"
+        f" + :{RangeField.SA_HARD_COUNT.value} + :{RangeField.SA_MASTER_COUNT.value}"
+    ),
+    # Convert fractional mastery to percent.
+    RangeField.MASTERY_PEAK: f"100 * :{RangeField.MASTERY_PEAK.value}",
+}
+
 NO_PLAYER_FIELDS: SQLTableDict = OrderedDict(
     [
         (ListField.ARRANGEMENT_ID, ""),
@@ -129,6 +165,72 @@ NO_PLAYER_FIELDS: SQLTableDict = OrderedDict(
     ]
 )
 
+# All list fields, in a fixed order. A tuple is faster to iterate than the Enum.
+LIST_FIELDS: Tuple[ListField, ...] = tuple(ListField)
+# List field validator queries. These are fixed, so they stay in the connection's
+# statement cache. I assume we will never be interested in records relating to Vocals.
+VALIDATOR_SQL = (
+    f"SELECT {', '.join(list_field.value for list_field in LIST_FIELDS)}"
+    f"\n  FROM {ARRANGEMENTS_TABLE}"
+    f'\n  WHERE {ARRANGEMENT_NAME.value} != "Vocals";'
+)
+# Validator queries with value counts for reports, keyed by list field.
+VALIDATOR_REPORT_SQL: Dict[ListField, str] = {
+    list_field: (
+        f"SELECT {list_field.value}, COUNT(*)"
+        f"\n  FROM {ARRANGEMENTS_TABLE}"
+        f'\n  WHERE {ARRANGEMENT_NAME.value} != "Vocals"'
+        f"\n  GROUP BY {list_field.value};"
+    )
+    for list_field in LIST_FIELDS
+}
+
+# REPORT_OPTIONS defines the command line report menu for ArrangementDB.run_cl_reports.
+# Each option is a tuple of the menu text and either a list field for a unique value
+# report, or the name of the ArrangementDB report method.
+REPORT_OPTIONS: Tuple[Tuple[str, Union[ListField, str]], ...] = (
+    ("Tunings.           Report unique tuning names.", ListField.TUNING),
+    (
+        "Arrangement Types. Report unique arrangement types.",
+        ListField.ARRANGEMENT_NAME,
+    ),
+    ("Artists.           Report unique artist names.", ListField.ARTIST),
+    ("Albums.            Report unique album names.", ListField.ALBUM),
+    ("Titles.            Report unique song titles.", ListField.TITLE),
+    (
+        "Song Keys.         Report unique Rocksmith song keys.",
+        ListField.SONG_KEY,
+    ),
+    ("Path.              Report path types.", ListField.PATH),
+    ("Sub-path type.     Report sub-path.", ListField.SUB_PATH),
+    (
+        "No player data. Diagnostic. Reports on song arrangements that have "
+        "no data in the player profile.",
+        "_no_player_data_report",
+    ),
+    (
+        "Missing song data. Under development. Use with extreme caution.",
+        "_missing_song_data_report",
+    ),
+)
+
+# Warning text for ArrangementDB._missing_song_data_report.
+MISSING_SONG_DATA_WARNING = (
+    "WARNING. This is report is still under development."
+    "\n"
+    "\nThis report summarises arrangements that appear in the player profile, "
+    "but do not have any corresponding song"
+    "\narrangement data (title, artist, album, tuning, etc.). Possible causes "
+    "for this are:"
+    "\n    - The arrangements are lesson/practice tracks without song "
+    "names/details."
+    "\n    - DLC/Custom DLC has been removed from the library (and hence the "
+    "song data is no longer present, while the player"
+    "\n      history for the song arrangement is retained)."
+    "\nAs noted, this report is still under development. Use with caution for "
+    "now!"
+)
+
 # CFSM_MAP translates Customs Forge column arrangement titles to database fields.
 # CFSM map is ugly, but allows for easy remapping in the future if needed
 # See cfsm function for use and for manual processing of album, year
@@ -223,6 +325,25 @@ PLAYER_PROFILE_MAP: Dict[
     RangeField.SA_HARD_BADGES: (("SongsSA", ":a_id", "Badges", "Hard"), 0, int),
     RangeField.SA_MASTER_BADGES: (("SongsSA", ":a_id", "Badges", "Master"), 0, int),
 }
+# PLAYER_PROFILE_PATHS unpacks PLAYER_PROFILE_MAP for load_player_profile, with each
+# json path split at ':a_id'. Each entry is a tuple of:
+#   - The database field name (string value of the SQLField).
+#   - The json path to the subtree containing data for all arrangements (the part of
+#     the path before ':a_id').
+#   - The json path to the value from the arrangement data (the part after ':a_id').
+#   - The default value and the type conversion function.
+PLAYER_PROFILE_PATHS: List[
+    Tuple[str, JSON_path_type, JSON_path_type, Union[int, float], Callable]
+] = [
+    (
+        field.value,
+        tuple(path[: list(path).index(":a_id")]),
+        tuple(path[list(path).index(":a_id") + 1 :]),
+        default,
+        convert,
+    )
+    for field, (path, default, convert) in PLAYER_PROFILE_MAP.items()
+]
 
 
 class SQLTable:
@@ -235,6 +356,7 @@ class SQLTable:
         rebuild_table -- Runs an SQL script to drop the current table and recreate a new
             empty version of the table.
         write_row -- Write a row of data to the table.
+        write_rows -- Write multiple rows of data to the table in a single call.
         table_name -- Read only, the table name.
 
     """
@@ -245,6 +367,11 @@ class SQLTable:
     # table name  and primary key only needed for table functionality
     _table_name: str
     _primary: Optional[SQLField]
+    # SQL expressions that replace the named parameter for a field when writing rows.
+    _value_expressions: Dict[SQLField, str]
+    # Field names in table order, with a flag for fields that may be missing from the
+    # row values (i.e. calculated fields).
+    _row_keys: List[Tuple[str, bool]]
     _new_table_script: str
     _write_row_script: str
 
@@ -253,6 +380,7 @@ class SQLTable:
         fields_dict: SQLTableDict,
         table_name: str = "",
         primary: Optional[SQLField] = None,
+        value_expressions: Optional[Dict[SQLField, str]] = None,
     ) -> None:
         """Provide SQL table constructor.
 
@@ -267,11 +395,25 @@ class SQLTable:
                 list generation. (default: {""})
             primary {Optional[SQLField]} -- The SQL primary key field. Not required for
                 field list generation. (default: {None})
+            value_expressions {Optional[Dict[SQLField, str]]} -- SQL expressions for
+                calculated fields. When writing rows, the value for each of these fields
+                is calculated from its expression, which can refer to other fields as
+                named parameters (e.g. ':PlayedCount * 2'). Rows are written with
+                positional parameters, so these are converted to numbered parameters
+                when the row writing script is generated. (default: {None})
 
         """
         self._fields_dict = fields_dict
         self._table_name = table_name
         self._primary = primary
+        if value_expressions is None:
+            self._value_expressions = dict()
+        else:
+            self._value_expressions = value_expressions
+        self._row_keys = [
+            (field.value, field in self._value_expressions)
+            for field in self._fields_dict
+        ]
         self._new_table_script = ""
         self._write_row_script = ""
 
@@ -374,7 +516,6 @@ class SQLTable:
             self._new_table_script = script
 
         conn.executescript(self._new_table_script)  # cSpell: disable-line
-        conn.close()
 
     def write_row(
         self,
@@ -392,7 +533,8 @@ class SQLTable:
                 The keys of the dictionary *must* be the string values of the SQLField
                 Enum used to define the SQLTable (i.e. the SQLFields defined in the
                 fields_dict argument to __init__), and there must be a key/value pair
-                for *every* field the SQLTable. For example, if a table was defined with
+                for *every* field the SQLTable, other than calculated fields (see
+                value_expressions in __init__). For example, if a table was defined with
                 the fields ListField.ARTIST, RangeField.PITCH and ListField.TUNING, then
                 the values dictionary should be of the form:
 
@@ -408,6 +550,73 @@ class SQLTable:
 
         As this routine should be called repeatedly, the caller is responsible for
         commit and close.
+        """
+        conn.execute(self._row_script(values, replace), self._row_tuple(values))
+
+    def write_rows(
+        self,
+        conn: sqlite3.Connection,
+        rows: Sequence[Dict[str, Optional[Union[float, int, str]]]],
+        replace: bool = False,
+    ) -> None:
+        """Write a sequence of value dictionaries into rows in the database.
+
+        Arguments:
+            conn {sqlite3.Connection} -- Connection to database for table.
+            rows {Sequence[Dict[str, Optional[Union[float, int, str]]]]} -- The value
+                dictionaries to be written. Each dictionary must be of the form
+                described in write_row.
+            replace {bool} -- As for write_row.
+
+        The rows are written with a single executemany call, which is much faster than
+        calling write_row for each row. The caller is responsible for commit and close.
+
+        The rows are written in primary key order, so that the primary key index is
+        built by appending rather than by inserts at random positions. The sort is
+        stable, so for replace=True, the last of any rows with the same primary key
+        value is still the one that ends up in the table.
+        """
+        if rows:
+            script = self._row_script(rows[0], replace)
+            # _row_script has checked that the primary key is defined.
+            primary = list(self._fields_dict).index(cast(SQLField, self._primary))
+            conn.executemany(
+                script,
+                sorted(map(self._row_tuple, rows), key=lambda row: str(row[primary])),
+            )
+
+    def _row_tuple(
+        self, values: Dict[str, Optional[Union[float, int, str]]]
+    ) -> Tuple[Optional[Union[float, int, str]], ...]:
+        """Convert a dictionary of row values to a tuple for positional binding.
+
+        Arguments:
+            values {Dict[str, Optional[Union[float, int, str]]]} -- A dictionary of
+                values as described in write_row.
+
+        Raises:
+            KeyError -- If there is no value for a field that is not calculated.
+
+        Returns:
+            Tuple[Optional[Union[float, int, str]], ...] -- The values in table field
+                order. Calculated fields without a value are set to None.
+
+        """
+        return tuple(
+            values.get(key) if calculated else values[key]
+            for key, calculated in self._row_keys
+        )
+
+    def _row_script(
+        self, values: Dict[str, Optional[Union[float, int, str]]], replace: bool
+    ) -> str:
+        """Return the (cached) SQL script for writing a row of values.
+
+        Arguments:
+            values {Dict[str, Optional[Union[float, int, str]]]} -- A dictionary of
+                values as described in write_row. Only used for primary key checks.
+            replace {bool} -- As for write_row.
+
         """
         if replace:
             action = "INSERT OR REPLACE INTO"
@@ -432,9 +641,19 @@ class SQLTable:
                     f"table named '{self._table_name}'."
                 ) from k_e
 
-            # create and cache the script.
+            # create and cache the script. We use numbered positional parameters
+            # (?1, ?2, ...) in field order, so that calculated field expressions can
+            # refer to other fields.
             field_list = self.field_list(prefix="  ")
-            target_list = self.field_list(prefix="    :")
+            index = {key: i for i, (key, _) in enumerate(self._row_keys, start=1)}
+            targets = list()
+            for field in self._fields_dict:
+                expression = self._value_expressions.get(field, f":{field.value}")
+                targets.append(
+                    re.sub(r":(\w+)", lambda m: f"?{index[m.group(1)]}", expression)
+                )
+            target_list = ",\n".join(f"    {target}" for target in targets)
+            target_list = f"{target_list}\n"
 
             # Property will raise exception if table name doesn't exist.
             self._write_row_script = (
@@ -446,7 +665,7 @@ class SQLTable:
                 f"  );"
             )
 
-        conn.execute(self._write_row_script, values)
+        return self._write_row_script
 
 
 class SongListSQLGenerator:
@@ -456,31 +675,38 @@ class SongListSQLGenerator:
     a song_list_set returned from:
         rsrtools.songlists.configclasses.song_list_set[value]
 
-    The class creates two sets of sql queries for song list generation, both of which
+    The class creates three sets of sql queries for song list generation, all of which
     are public attributes:
         tmp_table_sql -- Provides the sql for the temporary tables.
         song_list_sql -- Provides the sql for the song lists in the song list set.
+        song_key_sql -- Provides the sql for the unique song keys in each song list
+            in the song list set (song_list_sql returns full records, which may
+            include duplicate song keys).
 
-    Both of these attributes are lists, where each element is a tuple consisting of:
+    These attributes are lists, where each element is a tuple consisting of:
         - The SQL query text {Optional[str]}.
         - A sub-tuple of where values to be substituted into the SQL query ((?) form)
           {Optional[Tuple[Union[str, int, float]]]}.
         - An empty song list is represented by the tuple (None, None).
 
-    Both attributes are mutable, but are only intended for use in a read-only mode by
+    The attributes are mutable, but are only intended for use in a read-only mode by
     ArrangementDB.
 
     """
 
     # instance variables
     song_list_sql: List[SQLClause]
+    song_key_sql: List[SQLClause]
     tmp_table_sql: List[SQLClause]
     _list_validator: ListValidator
     _next_table_index: int
-    _song_list_set: List[str]
+    _song_list_set: Tuple[str, ...]
     _filter_definitions: Dict[str, Filter]
-    # table_map maps filter names to table names
+    # table_map maps filter names to temporary table names (for filters that have one)
     _table_map: Dict[str, str]
+    # where_cache maps filter names to WHERE clauses, as a filter's WHERE clause may be
+    # needed for more than one query.
+    _where_cache: Dict[str, SQLClause]
     _root_table: str
 
     def __init__(
@@ -490,6 +716,7 @@ class SongListSQLGenerator:
         list_validator: ListValidator,
         arrangements_sql: SQLTable,
         profile_sql: SQLTable,
+        where_cache: Optional[Dict[str, SQLClause]] = None,
     ) -> None:
         """Generate song list sql queries for a song list set and filter definitions.
 
@@ -502,31 +729,39 @@ class SongListSQLGenerator:
                 that will be used for SQL generation. Refer to the package
                 documentation, songlists.config and songlists.configclasses for more
                 details.
-            list_validator {Dict[ListField, List[str]]} -- For each list field in the
-                dictionary, a list of valid values for this field.
+            list_validator {Dict[ListField, FrozenSet[str]]} -- For each list field in
+                the dictionary, the set of valid values for this field.
             arrangements_name {str} -- Rocksmith arrangements table name.
             profile_name {str} -- Player profile table name.
 
+        Keyword Arguments:
+            where_cache {Optional[Dict[str, SQLClause]]} -- Cache of WHERE clauses keyed
+                by filter name, which may be shared between generators that use the
+                same filter definitions and list validator. If None, the generator uses
+                its own cache. (default: {None})
+
         After initialisation, the sql queries are provided in fields tmp_table_sql and
         song_list_sql. Refer to the class documentation for more details.
         """
         self._filter_definitions = filter_definitions
         self._list_validator = list_validator
-        if len(song_list_set) > MAX_SONG_LIST_COUNT:
-            # Rocksmith supports up to 6 song lists. Discard any beyond this.
-            self._song_list_set = song_list_set[0:MAX_SONG_LIST_COUNT]
-        else:
-            self._song_list_set = song_list_set[:]
+        # Rocksmith supports up to 6 song lists. Discard any beyond this.
+        self._song_list_set = tuple(song_list_set[:MAX_SONG_LIST_COUNT])
 
         self.tmp_table_sql = list()
         self.song_list_sql = list()
+        self.song_key_sql = list()
         self._table_map = dict()
+        self._where_cache = dict() if where_cache is None else where_cache
         self._next_table_index = 1
 
-        # set up for the root table for all filters
+        # set up for the root table for all filters. This is a view rather than a
+        # table, so that we don't materialise a copy of the full join. SQLite
+        # flattens the view into the queries built on it, which lets it push filter
+        # conditions down into the join.
         self._root_table = self._next_table_name()
 
-        self.tmp_table_sql.append((f"DROP TABLE IF EXISTS {self._root_table};", ()))
+        self.tmp_table_sql.append((f"DROP VIEW IF EXISTS {self._root_table};", ()))
 
         # Specify arrangement ID explicitly below
         arrangement_fields = arrangements_sql.field_list(
@@ -538,7 +773,7 @@ class SongListSQLGenerator:
 
         # note that we exclude vocals here
         sql_text = (
-            f"CREATE TEMP TABLE {self._root_table} AS SELECT"
+            f"CREATE TEMP VIEW {self._root_table} AS SELECT"
             f"\n    {arrangements_sql.table_name}.{ARRANGEMENT_ID.value} "
             f"AS {ARRANGEMENT_ID.value},"
             f"\n{arrangement_fields},"
@@ -579,32 +814,67 @@ class SongListSQLGenerator:
         # grab the name for the table we are creating.
         new_table = self._table_map[filter_name]
 
+        base_table, base_values = self._base_table(filter_name)
         where_clause, where_values = self._where_clause(filter_name)
 
         # set up the SQL query for the table
+        # Note: the temp tables are deliberately not indexed. Each one is only read by
+        # a handful of child queries, and building an index costs more than the table
+        # scans it would save at song library sizes.
         self.tmp_table_sql.append((f"DROP TABLE IF EXISTS {new_table};", ()))
 
         query = (
             f"CREATE TEMP TABLE {new_table} AS SELECT * "
-            f"FROM {self._base_table(filter_name)}"
+            f"FROM {base_table}"
             f"\n{where_clause};"
         )
-        self.tmp_table_sql.append((query, where_values))
+        self.tmp_table_sql.append((query, base_values + where_values))
 
-    def _base_table(self, filter_name: str) -> str:
-        """Return the name of the base SQL table {str} for the named filter."""
+    def _base_table(self, filter_name: str) -> SQLClause:
+        """Return the SQL source for the base data of the named filter.
+
+        Arguments:
+            filter_name {str} -- The filter name.
+
+        Returns:
+            Tuple[str, Tuple[Union[str, int, float], ...]] -- SQLClause, the base SQL
+                source and the tuple of values to be substituted into it.
+
+        The source is the root table if the filter has no base filter, or the temporary
+        table for the base filter if there is one. Otherwise, the base filter query is
+        inlined as a sub-query, which SQLite flattens into the query using it.
+        """
         base_filter = self._filter_definitions[filter_name].base
-        if base_filter:
-            base_table = self._table_map[base_filter]
-        else:
+        if not base_filter:
             # Undefined base filter, so use the root table name.
-            base_table = self._root_table
+            return self._root_table, ()
+
+        if base_filter in self._table_map:
+            return self._table_map[base_filter], ()
 
-        return base_table
+        base_table, base_values = self._base_table(base_filter)
+        where_clause, where_values = self._where_clause(base_filter)
+        return (
+            f"(SELECT * FROM {base_table}\n{where_clause})",
+            base_values + where_values,
+        )
 
     def _generate_table_sql(self) -> None:
-        """Create the SQL for all temporary tables needed for the song list set."""
+        """Create the SQL for all temporary tables needed for the song list set.
+
+        Temporary tables are only created for base filters that provide data for two or
+        more filters in the song list set (song list filters or other base filters).
+        Base filters used by a single filter are inlined into that filter's query
+        instead, which avoids copying the data into a table that is read only once.
+        """
         pending_tables: List[str] = list()
+        # Set of the pending tables for fast membership tests (the list preserves
+        # order for generation and error reporting).
+        pending_set: Set[str] = set()
+        # All base filters needed for the song list set, in dependency order (i.e.
+        # every base filter appears before the filters that use it).
+        base_filters: List[str] = list()
+        checked: Set[str] = set()
 
         for filter_name in self._song_list_set:
             if not filter_name:
@@ -625,34 +895,47 @@ class SongListSQLGenerator:
                     raise KeyError(f"No definition for filter {this_filter}.")
 
                 # Do a quick check on circular filter definitions.
-                if this_filter in pending_tables:
+                if this_filter in pending_set:
                     raise RSFilterError(
                         f"Filter {this_filter} is recursive - \nit appears as a "
                         f"parent filter to itself. "
                         f"Recursive filter list follows.\n   {pending_tables}"
                     )
 
-                if this_filter not in self._table_map:
-                    # Filter definition exists, but Table SQl doesn't.
+                if this_filter not in checked:
+                    # Filter definition exists, but hasn't been checked yet.
                     # Add to list for generation later.
                     pending_tables.append(this_filter)
+                    pending_set.add(this_filter)
 
                     # But before we do generation, we also need to check that the base
-                    # filter table SQL exists
+                    # filter exists
                     this_filter = self._filter_definitions[this_filter].base
                 else:
-                    # Filter table SQL already defined, no more checking to do.
+                    # Filter already checked, no more checking to do.
                     break
 
-            # Now do the generation for this **filter_name**
+            # pop out the tables in the sequence.
+            # Popping allows us to work our way from the deepest base filter
+            # back up to the base filter for filter_name.
             while pending_tables:
-                # pop out the next table in the sequence.
-                # Popping allows us to work our way from the deepest base filter
-                # back up to the base filter for filter_name. Consequently, the
-                # table_map should contain definitions for base tables before they
-                # are needed.
                 this_filter = pending_tables.pop()
-
+                pending_set.discard(this_filter)
+                checked.add(this_filter)
+                base_filters.append(this_filter)
+
+        # Count the distinct filters that use each base filter.
+        users: Dict[str, Set[str]] = dict()
+        for this_filter in set(base_filters).union(self._song_list_set):
+            if this_filter:
+                base = self._filter_definitions[this_filter].base
+                users.setdefault(base, set()).add(this_filter)
+
+        # Now do the generation, working from the deepest base filters up. Consequently,
+        # the table_map should contain definitions for base tables before they are
+        # needed.
+        for this_filter in base_filters:
+            if len(users[this_filter]) > 1:
                 # Create a table name for this_filter - this should be the only place we
                 # add entries to table map.
                 self._table_map[this_filter] = self._next_table_name()
@@ -669,6 +952,7 @@ class SongListSQLGenerator:
             if not filter_name:
                 # empty song list - mark this for skipping
                 self.song_list_sql.append(("", ()))
+                self.song_key_sql.append(("", ()))
 
             else:
                 if filter_name not in self._filter_definitions:
@@ -678,14 +962,25 @@ class SongListSQLGenerator:
 
                 sql_text = SQLTable(SONG_LIST_FIELDS).field_list(prefix="    ")
 
+                base_table, base_values = self._base_table(filter_name)
+
                 sql_text = (
                     f"SELECT"
                     f"\n{sql_text}"
-                    f"  FROM {self._base_table(filter_name)}"
+                    f"  FROM {base_table}"
+                    f"\n{where_clause};"
+                )
+
+                self.song_list_sql.append((sql_text, base_values + where_values))
+
+                # SQLite eliminates the duplicate song keys for this query.
+                sql_text = (
+                    f"SELECT DISTINCT {ListField.SONG_KEY.value}"
+                    f"\n  FROM {base_table}"
                     f"\n{where_clause};"
                 )
 
-                self.song_list_sql.append((sql_text, where_values))
+                self.song_key_sql.append((sql_text, base_values + where_values))
 
     def _where_clause(self, filter_name: str) -> SQLClause:
         """Return a SQL WHERE clause for a named filter.
@@ -703,7 +998,11 @@ class SongListSQLGenerator:
                 clause for the filter and the tuple of values to be substituted into the
                 filter.
 
+        The clause is only generated once for each filter name.
         """
+        if filter_name in self._where_cache:
+            return self._where_cache[filter_name]
+
         try:
             clause, values = self._filter_definitions[filter_name].where_clause(
                 self._list_validator
@@ -713,6 +1012,7 @@ class SongListSQLGenerator:
                 f"WHERE clause error for filter {filter_name}.\n{exc}"
             ) from exc
 
+        self._where_cache[filter_name] = (clause, values)
         return clause, values
 
 
@@ -743,7 +1043,11 @@ class ArrangementDB:
             database with data read from the named profile in the profile_manager
             (an RSProfileManager instance).
 
-        open_db -- Utility method for opening the database.
+        open_db -- Utility method for opening the database. Returns a connection that
+            is held open for the life of the instance.
+
+        close -- Closes the database connection. The class also supports use as a
+            context manager, which closes the connection on exit.
 
         flush_player_profile -- Deletes the player profile table and re-creates an empty
             player profile table.
@@ -763,6 +1067,18 @@ class ArrangementDB:
     _db_file_path: Path
     _arrangements_sql: SQLTable
     _profile_sql: SQLTable
+    # Cache of list field validators. Cleared whenever the arrangements table changes.
+    _validator_cache: ListValidator
+    # Cache of song list SQL generators, keyed by song list set and a representation of
+    # the filter definitions. Also cleared whenever the arrangements table changes, as
+    # the SQL depends on the list validators.
+    _sql_cache: Dict[Tuple[Tuple[str, ...], str], "SongListSQLGenerator"]
+    # WHERE clauses shared by the generators for all song list sets, keyed by filter
+    # name. Only valid for the filter definitions represented by _where_cache_key.
+    _where_cache: Dict[str, SQLClause]
+    _where_cache_key: str
+    # Connection held for the lifetime of the instance (opened on first use).
+    _conn: Optional[sqlite3.Connection]
 
     def __init__(self, db_path: Optional[Path] = None) -> None:
         """Initialise instance path to database, initialise table structure classes.
@@ -782,11 +1098,63 @@ class ArrangementDB:
         self._arrangements_sql = SQLTable(
             ARRANGEMENT_FIELDS, ARRANGEMENTS_TABLE, ARRANGEMENT_ID
         )
-        self._profile_sql = SQLTable(PROFILE_FIELDS, PROFILE_TABLE, ARRANGEMENT_ID)
+        self._profile_sql = SQLTable(
+            PROFILE_FIELDS,
+            PROFILE_TABLE,
+            ARRANGEMENT_ID,
+            value_expressions=PROFILE_CALCULATED_FIELDS,
+        )
+        self._validator_cache = dict()
+        self._sql_cache = dict()
+        self._where_cache = dict()
+        self._where_cache_key = ""
+        self._conn = None
+
+    def __enter__(self) -> "ArrangementDB":
+        """Return ArrangementDB instance for context manager."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> Literal[False]:
+        """Clean up for context manager."""
+        self.close()
+        # Don't suppress exceptions
+        return False
+
+    def close(self) -> None:
+        """Close the database connection, if it is open."""
+        if self._conn is not None:
+            # Let SQLite update any planner statistics it thinks are stale.
+            self._conn.execute("PRAGMA optimize;")
+            self._conn.close()
+            self._conn = None
+
+    def _clear_caches(self) -> None:
+        """Clear cached data that depends on the arrangements table."""
+        self._validator_cache.clear()
+        self._sql_cache.clear()
+        self._where_cache.clear()
 
     def open_db(self) -> sqlite3.Connection:
-        """Open/connect to database."""
-        return sqlite3.connect(self._db_file_path)
+        """Return the connection to the database, opening it if needed.
+
+        The instance holds a single connection for its lifetime, so callers should not
+        close the connection (use close() instead).
+
+        The connection is in autocommit mode with bulk load PRAGMAs applied. Callers
+        that write multiple rows are responsible for explicit BEGIN/COMMIT statements.
+        """
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                self._db_file_path, isolation_level=None, cached_statements=256
+            )
+            self._conn.executescript(BULK_LOAD_PRAGMAS)  # cSpell: disable-line
+
+        return self._conn
 
     def _table_has_data(self, name: str) -> bool:
         """Return boolean indicating if the named table contains data.
@@ -822,8 +1190,6 @@ class ArrangementDB:
                 if count[0] == 0:
                     ret_val = False
 
-            conn.close()
-
         return ret_val
 
     @property
@@ -856,15 +1222,18 @@ class ArrangementDB:
         """
         if last_modified is None:
             self._arrangements_sql.rebuild_table(self.open_db())
+            self._clear_caches()
 
         mtime = 0.0
 
-        conn = self.open_db()
+        # Collect all of the rows and then write them in a single call, so that the
+        # insert statement is only prepared once.
+        rows: List[Dict[str, Optional[Union[str, int, float]]]] = list()
         count = 1
         for sql_values in Scanner().db_entries(last_modified=last_modified):
 
             mtime = max(mtime, sql_values[RangeField.LAST_MODIFIED.value])
-            self._arrangements_sql.write_row(conn, sql_values, replace=True)
+            rows.append(sql_values)
 
             if show_progress:
                 if count % 10 == 0:
@@ -874,8 +1243,14 @@ class ArrangementDB:
                     )
                 count = count + 1
 
-        conn.commit()
-        conn.close()
+        # Single explicit transaction for the whole load.
+        conn = self.open_db()
+        conn.execute("BEGIN IMMEDIATE;")
+        self._arrangements_sql.write_rows(conn, rows, replace=True)
+        conn.execute("COMMIT;")
+        # Refresh the query planner statistics for the new data.
+        conn.execute(f"ANALYZE {self._arrangements_sql.table_name};")
+        self._clear_caches()
 
         return mtime
 
@@ -890,55 +1265,75 @@ class ArrangementDB:
         Deprecated, due for deletion.
         """
         self._arrangements_sql.rebuild_table(self.open_db())
-        # create file object from path to keep mypy happy
-        # (e-tree seems to grok path-likes, but annotations don't reflect this)
-        with cfsm_xml_file.open("rt") as file_handle:
-            tree = eTree.parse(file_handle)
+        self._clear_caches()
 
-        root = tree.getroot()
+        # Reverse map for a single pass over the child elements of each data row.
+        tag_map = {cfsm_tag: sql_key.value for sql_key, cfsm_tag in CFSM_MAP.items()}
+        album_date_tag = "colArtistTitleAlbumDate"
 
-        conn = self.open_db()
-        # keep mypy happy even though we will only fill with str or None values
-        sql_values: Dict[str, Optional[Union[str, int, float]]] = dict()
-        for data_row in root:
-            for sql_key, cfsm_tag in CFSM_MAP.items():
-                try:
-                    element = data_row.find(cfsm_tag)
-                    if element is None:
-                        sql_values[sql_key.value] = None
-                    else:
-                        sql_values[sql_key.value] = element.text
-                except AttributeError:
-                    # some fields don't exist for e.g. Vocal arrangements.
-                    # set as empty
-                    sql_values[sql_key.value] = None
-
-            # and the ugly hard coded manual handles
-            try:
-                element = data_row.find("colArtistTitleAlbumDate")
-                if element is None or element.text is None:
+        # Collect all of the rows and then write them in a single call.
+        rows: List[Dict[str, Optional[Union[str, int, float]]]] = list()
+        # create file object from path to keep mypy happy
+        # (e-tree seems to grok path-likes, but annotations don't reflect this)
+        # Binary mode, as lxml only parses byte streams.
+        with cfsm_xml_file.open("rb") as file_handle:
+            # Parse incrementally, so we only hold one data row in memory at a time.
+            # Data rows are the children of the root element (depth 1).
+            depth = 0
+            for event, data_row in eTree.iterparse(
+                file_handle, events=("start", "end")
+            ):
+                if event == "start":
+                    depth = depth + 1
+                    continue
+
+                depth = depth - 1
+                if depth != 1:
+                    continue
+
+                # keep mypy happy even though we will only fill with str or None values
+                # Fields that don't exist (e.g. for Vocal arrangements) are left empty.
+                sql_values: Dict[str, Optional[Union[str, int, float]]] = dict.fromkeys(
+                    tag_map.values()
+                )
+                album_date: Optional[str] = None
+                # Reversed, so that the first of any repeated tags wins (same as find).
+                for element in reversed(data_row):
+                    if element.tag == album_date_tag:
+                        album_date = element.text
+                    elif element.tag in tag_map:
+                        sql_values[tag_map[element.tag]] = element.text
+
+                # Done with this row, release its children.
+                data_row.clear()
+
+                # and the ugly hard coded manual handles
+                if album_date is None:
                     sql_values[ListField.ALBUM.value] = None
                     sql_values[RangeField.YEAR.value] = None
                 else:
-                    _, _, sql_values[ListField.ALBUM.value], year = element.text.split(
+                    _, _, sql_values[ListField.ALBUM.value], year = album_date.split(
                         ";"
                     )
                     sql_values[RangeField.YEAR.value] = year[:4]
-            except AttributeError:
-                sql_values[ListField.ALBUM.value] = None
-                sql_values[RangeField.YEAR.value] = None
 
-            # And lastly, the elements we can't get from CFSM
-            sql_values[ListField.PATH.value] = "Not available (run scanner)"
-            sql_values[ListField.SUB_PATH.value] = "Not available (run scanner)"
-            sql_values[RangeField.LAST_MODIFIED.value] = -1
-            sql_values[RangeField.SONG_LENGTH.value] = 0
+                # And lastly, the elements we can't get from CFSM
+                sql_values[ListField.PATH.value] = "Not available (run scanner)"
+                sql_values[ListField.SUB_PATH.value] = "Not available (run scanner)"
+                sql_values[RangeField.LAST_MODIFIED.value] = -1
+                sql_values[RangeField.SONG_LENGTH.value] = 0
 
-            # At this point we should have value entries for all fields in the table
-            self._arrangements_sql.write_row(conn, sql_values)
+                # At this point we should have value entries for all fields in the table
+                rows.append(sql_values)
 
-        conn.commit()
-        conn.close()
+        # Single explicit transaction for the whole load.
+        conn = self.open_db()
+        conn.execute("BEGIN IMMEDIATE;")
+        self._arrangements_sql.write_rows(conn, rows)
+        conn.execute("COMMIT;")
+        # Refresh the query planner statistics for the new data.
+        conn.execute(f"ANALYZE {self._arrangements_sql.table_name};")
+        self._clear_caches()
 
     def flush_player_profile(self) -> None:
         """Delete player profile table and create a new, empty one."""
@@ -958,59 +1353,69 @@ class ArrangementDB:
         """
         self.flush_player_profile()
 
-        conn = self.open_db()
-
-        # we are going to create and override the values in this dict() repeatedly.
-        value_dict: Dict[str, Optional[Union[str, int, float]]] = dict()
-
-        for a_id in profile_manager.player_arrangement_ids(profile_name):
-            value_dict[ListField.ARRANGEMENT_ID.value] = a_id
-
-            for key, item in PLAYER_PROFILE_MAP.items():
-                json_path = list(item[0])
-
-                for i in range(  # pylint: disable=consider-using-enumerate
-                    len(json_path)
-                ):
-                    if json_path[i] == ":a_id":
-                        json_path[i] = a_id
+        # Collect all of the rows and then write them in a single call.
+        rows: List[Dict[str, Optional[Union[str, int, float]]]] = list()
 
+        # Get the subtrees containing data for all arrangements once, rather than
+        # walking the json tree from the root for every value of every arrangement.
+        subtrees: Dict[JSON_path_type, Any] = dict()
+        for _, root_path, _, _, _ in PLAYER_PROFILE_PATHS:
+            if root_path not in subtrees:
                 try:
-                    value = profile_manager.copy_player_json_value(
-                        profile_name, json_path
+                    subtrees[root_path] = profile_manager.get_json_subtree(
+                        profile_name, root_path
                     )
-                    # type conversion
-                    value = item[2](value)
                 except (KeyError, IndexError):
-                    # not found, return default
-                    value = item[1]
+                    # No data for any arrangement, so we will use defaults.
+                    subtrees[root_path] = dict()
 
-                value_dict[key.value] = value
+        for a_id in profile_manager.player_arrangement_ids(profile_name):
+            value_dict: Dict[str, Optional[Union[str, int, float]]] = {
+                ListField.ARRANGEMENT_ID.value: a_id
+            }
+
+            for name, root_path, sub_path, default, convert in PLAYER_PROFILE_PATHS:
+                # We only read the subtrees, so no need for the deep copy provided by
+                # profile_manager.copy_player_json_value.
+                # Type errors mean we have hit a value where we expected a dict or list,
+                # which is not found for our purposes.
+                try:
+                    value = subtrees[root_path][a_id]
+                    for path_item in sub_path:
+                        value = value[path_item]
+                except (KeyError, IndexError, TypeError):
+                    # not found, return default
+                    value_dict[name] = default
+                else:
+                    # type conversion
+                    value_dict[name] = convert(value)
 
-            # And a set of annoying manual fixes for accumulation/percent values.
-            sa_played = 0
-            for sa_key in (
-                RangeField.SA_EASY_COUNT,
-                RangeField.SA_MEDIUM_COUNT,
-                RangeField.SA_HARD_COUNT,
-                RangeField.SA_MASTER_COUNT,
-            ):
-                # If these aren't a numeric type, everything should blow up.
-                sa_played = sa_played + cast(int, value_dict[sa_key.value])
+            # SAPlayedCount and MasteryPeak percent are calculated in the database
+            # (see PROFILE_CALCULATED_FIELDS).
+            # At this point we should have value entries for all fields in the table
+            rows.append(value_dict)
 
-            # These two are calculated fields, not directly available from the profile
-            # Maybe it would have been better to do this in the database?
-            value_dict[RangeField.SA_PLAYED_COUNT.value] = sa_played
+        # Single explicit transaction for the whole load.
+        conn = self.open_db()
+        conn.execute("BEGIN IMMEDIATE;")
+        self._profile_sql.write_rows(conn, rows)
+        conn.execute("COMMIT;")
+        # Refresh the query planner statistics for the new data.
+        conn.execute(f"ANALYZE {self._profile_sql.table_name};")
 
-            value_dict[RangeField.MASTERY_PEAK.value] = 100 * cast(
-                float, value_dict[RangeField.MASTERY_PEAK.value]
-            )
+    @staticmethod
+    def _print_query_rows(conn: sqlite3.Connection, query: str) -> None:
+        """Print the rows returned by a report query to stdout, one row per line.
 
-            # At this point we should have value entries for all fields in the table
-            self._profile_sql.write_row(conn, value_dict)
+        Arguments:
+            conn {sqlite3.Connection} -- Connection to the database.
+            query {str} -- The SQL query for the report.
 
-        conn.commit()
-        conn.close()
+        Rows are fetched and written in batches, rather than printed one at a time.
+        """
+        cursor = conn.execute(query)
+        while rows := cursor.fetchmany(REPORT_FETCH_SIZE):
+            sys.stdout.write("".join(f"{row}\n" for row in rows))
 
     def _no_player_data_report(self) -> None:
         """Report on on songs that don't appear in the player profile.
@@ -1043,10 +1448,7 @@ class ArrangementDB:
             f"\n    );"
         )
 
-        for row in conn.execute(sql_text):
-            print(row)
-
-        conn.close()
+        self._print_query_rows(conn, sql_text)
 
     def _missing_song_data_report(self) -> None:
         """Report on song id that appear in player profile but not arrangement data.
@@ -1054,21 +1456,7 @@ class ArrangementDB:
         This is a quick and dirty report, and very experimental at the moment. Read
         the warnings in the method for more detail.
         """
-        print(
-            "WARNING. This is report is still under development."
-            "\n"
-            "\nThis report summarises arrangements that appear in the player profile, "
-            "but do not have any corresponding song"
-            "\narrangement data (title, artist, album, tuning, etc.). Possible causes "
-            "for this are:"
-            "\n    - The arrangements are lesson/practice tracks without song "
-            "names/details."
-            "\n    - DLC/Custom DLC has been removed from the library (and hence the "
-            "song data is no longer present, while the player"
-            "\n      history for the song arrangement is retained)."
-            "\nAs noted, this report is still under development. Use with caution for "
-            "now!"
-        )
+        print(MISSING_SONG_DATA_WARNING)
 
         input("Enter to run report ->")
 
@@ -1087,10 +1475,7 @@ class ArrangementDB:
             f"\n  );"
         )
 
-        for row in conn.execute(query):
-            print(row)
-
-        conn.close()
+        self._print_query_rows(conn, query)
 
     def list_validator(
         self, target: Optional[ListField] = None, write_report: bool = False
@@ -1107,47 +1492,49 @@ class ArrangementDB:
                 (default: {False})
 
         Returns:
-            Dict[ListField, List[str]] -- For each list field in the dictionary,
-                a list of valid values for this field.
+            Dict[ListField, FrozenSet[str]] -- For each list field in the dictionary,
+                the set of valid values for this field.
 
-        The validator lists created by this method are intended for use in creating song
-        lists or UI drop down lists.
+        The validator sets created by this method are intended for use in creating song
+        lists or UI drop down lists. The sets are cached until the arrangements table is
+        next modified by this instance, so reports always query the database.
 
         """
         if target is None:
             # Create validators for ALL list fields.
-            validators = tuple(ListField)
+            validators = LIST_FIELDS
         else:
             # Create a validator for the single specified field.
             validators = (target,)
 
-        ret_dict = dict()
+        # Reports are only written for a single target field.
+        report_target = target if write_report else None
 
         conn = self.open_db()
 
-        for list_field in validators:
-            # I assume we will never be interested in records relating to Vocals.
-            query = (
-                f"SELECT {list_field.value}, COUNT(*)"
-                f"\n  FROM {self._arrangements_sql.table_name}"
-                f'\n  WHERE {ARRANGEMENT_NAME.value} != "Vocals"'
-                f"\n  GROUP BY {list_field.value};"
-            )
-
-            result = conn.execute(query).fetchall()
-            value_list = [i[0] for i in result]
-            ret_dict[list_field] = value_list
-
-            if write_report and target is not None:
-                print()
-                print(f"  {len(result)} unique records for {list_field.value}")
-                print("    Unique item: Count")
-                for i in result:
-                    print(f"    {i[0]}: {i[1]}")
-
-        conn.close()
+        if report_target is not None:
+            # We need counts for the report, so group by the target field.
+            result = conn.execute(VALIDATOR_REPORT_SQL[report_target]).fetchall()
+            print()
+            print(f"  {len(result)} unique records for {report_target.value}")
+            print("    Unique item: Count")
+            for i in result:
+                print(f"    {i[0]}: {i[1]}")
+
+            self._validator_cache[report_target] = frozenset(map(itemgetter(0), result))
+
+        elif not self._validator_cache.keys() >= set(validators):
+            # Refresh all of the validators with a single table scan.
+            rows = conn.execute(VALIDATOR_SQL).fetchall()
+            for idx, list_field in enumerate(LIST_FIELDS):
+                # Sets for constant time membership tests in filter validation.
+                self._validator_cache[list_field] = frozenset(
+                    map(itemgetter(idx), rows)
+                )
 
-        return ret_dict
+        return {
+            list_field: self._validator_cache[list_field] for list_field in validators
+        }
 
     def generate_song_lists(
         self,
@@ -1175,36 +1562,69 @@ class ArrangementDB:
         """
         song_lists: List[Optional[List[str]]] = list()
 
-        # I could have created a list_validator member. However this would need to be
-        # refreshed after every routine that modified the SQL tables. It is easier to
-        # just create it on demand.
-        sql_queries = SongListSQLGenerator(
-            song_list_set,
-            filter_definitions,
-            self.list_validator(),
-            arrangements_sql=self._arrangements_sql,
-            profile_sql=self._profile_sql,
-        )
+        # The generated SQL only depends on the song list set, the filter definitions
+        # and the list validators, so we reuse it for repeat generations (e.g. after a
+        # player profile refresh). The dataclass repr captures the filter definitions.
+        cache_key = (tuple(song_list_set), repr(filter_definitions))
+        sql_queries = self._sql_cache.get(cache_key)
+        if sql_queries is None:
+            if len(self._sql_cache) >= SQL_CACHE_SIZE:
+                self._sql_cache.clear()
+
+            # Filters are shared between song list sets, so their WHERE clauses are
+            # reused across sets until the filter definitions change.
+            if cache_key[1] != self._where_cache_key:
+                self._where_cache.clear()
+                self._where_cache_key = cache_key[1]
+
+            # list_validator caches the validators, and refreshes them after any change
+            # to the arrangements table.
+            sql_queries = SongListSQLGenerator(
+                song_list_set,
+                filter_definitions,
+                self.list_validator(),
+                arrangements_sql=self._arrangements_sql,
+                profile_sql=self._profile_sql,
+                where_cache=self._where_cache,
+            )
+            self._sql_cache[cache_key] = sql_queries
 
         conn = self.open_db()
-        for query, values in sql_queries.tmp_table_sql:
-            # create the temporary tables needed for the queries.
-            conn.execute(query, values)
+        # create the temporary tables needed for the queries, in a single transaction.
+        conn.execute("BEGIN;")
+        try:
+            for query, values in sql_queries.tmp_table_sql:
+                conn.execute(query, values)
+        except sqlite3.Error:
+            conn.execute("ROLLBACK;")
+            raise
+        conn.execute("COMMIT;")
+
+        if debug_target is None:
+            # We only need the song keys, which are already unique.
+            song_list_queries = sql_queries.song_key_sql
+        else:
+            # The debug report shows the full records.
+            song_list_queries = sql_queries.song_list_sql
 
-        for idx, (query, values) in enumerate(sql_queries.song_list_sql):
+        for idx, (query, values) in enumerate(song_list_queries):
             if not query:
                 # empty string = skipped song list
                 song_lists.append(None)
             else:
                 # Run the queries for each song list, report out as needed.
-                results = conn.execute(query, values).fetchall()
+                cursor = conn.execute(query, values)
 
-                # use a set comprehension to eliminate duplicate song ids thrown up by
-                # the query.
-                songs = {record[0] for record in results}
-                song_lists.append(list(songs))
+                if debug_target is None:
+                    song_lists.append([record[0] for record in cursor])
+
+                else:
+                    # The debug report needs the record count before the records.
+                    results = cursor.fetchall()
+                    # use a set comprehension to eliminate duplicate song ids thrown up
+                    # by the query.
+                    song_lists.append(list({record[0] for record in results}))
 
-                if debug_target is not None:
                     print("-" * 80, file=debug_target)
                     print(file=debug_target)
                     print(
@@ -1212,10 +1632,9 @@ class ArrangementDB:
                         file=debug_target,
                     )
                     print(file=debug_target)
-                    for line in results:
-                        print(line, file=debug_target)
+                    # One write for all of the records.
+                    debug_target.write("".join(f"{line}\n" for line in results))
                     print("-" * 80, file=debug_target)
-        conn.close()
 
         return song_lists
 
@@ -1227,35 +1646,9 @@ class ArrangementDB:
                 "arrangement data."
             )
 
-        options = [
-            ("Tunings.           Report unique tuning names.", ListField.TUNING),
-            (
-                "Arrangement Types. Report unique arrangement types.",
-                ListField.ARRANGEMENT_NAME,
-            ),
-            ("Artists.           Report unique artist names.", ListField.ARTIST),
-            ("Albums.            Report unique album names.", ListField.ALBUM),
-            ("Titles.            Report unique song titles.", ListField.TITLE),
-            (
-                "Song Keys.         Report unique Rocksmith song keys.",
-                ListField.SONG_KEY,
-            ),
-            ("Path.              Report path types.", ListField.PATH),
-            ("Sub-path type.     Report sub-path.", ListField.SUB_PATH),
-            (
-                "No player data. Diagnostic. Reports on song arrangements that have "
-                "no data in the player profile.",
-                self._no_player_data_report,
-            ),
-            (
-                "Missing song data. Under development. Use with extreme caution.",
-                self._missing_song_data_report,
-            ),
-        ]
-
         while True:
             choice = choose(
-                options=options,
+                options=REPORT_OPTIONS,
                 header="Choose report to run",
                 no_action="Exit reports.",
             )
@@ -1266,8 +1659,9 @@ class ArrangementDB:
             actor = choice[0]
             if isinstance(actor, ListField):
                 self.list_validator(actor, write_report=True)
-            if callable(actor):
-                actor()
+            else:
+                # Report method name.
+                getattr(self, actor)()
 
     def cl_update_player_data(self, working_dir: Path) -> None:
         """Command line/interactive update of player data."""
@@ -1323,19 +1717,18 @@ def main() -> None:
 
     db_dir = Path(args.db_directory).resolve(True)
 
-    arr_db = ArrangementDB(db_dir)
-
-    if args.CFSMxml is not None:
-        arr_db.load_cfsm_arrangements(Path(args.CFSMxml).resolve(True))
+    with ArrangementDB(db_dir) as arr_db:
+        if args.CFSMxml is not None:
+            arr_db.load_cfsm_arrangements(Path(args.CFSMxml).resolve(True))
 
-    if args.scan_songs:
-        arr_db.scan_arrangements(show_progress=True)
+        if args.scan_songs:
+            arr_db.scan_arrangements(show_progress=True)
 
-    if args.update_player_data:
-        arr_db.cl_update_player_data(db_dir)
+        if args.update_player_data:
+            arr_db.cl_update_player_data(db_dir)
 
-    if args.reports:
-        arr_db.run_cl_reports()
+        if args.reports:
+            arr_db.run_cl_reports()
 
 
 if __name__ == "__main__":